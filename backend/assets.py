@@ -0,0 +1,65 @@
+import hashlib
+import os
+
+# ==========================
+# STATIC ASSETS
+# ==========================
+# The shared stylesheet and matrix/beep script are read once at import and
+# served from memory under content-hashed names (greylock.<hash>.css), so
+# browsers may cache them forever: an edited file gets a new URL. The
+# plain name still works but is always revalidated against its ETag.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_PREFIX = "/static"
+
+MEDIA_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+class Asset:
+    def __init__(self, name, body, media_type):
+        self.name = name
+        self.body = body
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etag = f'"{self.digest}"'
+        stem, ext = os.path.splitext(name)
+        self.hashed_name = f"{stem}.{self.digest}{ext}"
+        self.url = f"{STATIC_PREFIX}/{self.hashed_name}"
+
+
+class AssetTable:
+    def __init__(self, directory=STATIC_DIR):
+        self.by_name = {}
+        self.routes = {}
+        for name in sorted(os.listdir(directory)):
+            media_type = MEDIA_TYPES.get(os.path.splitext(name)[1])
+            if media_type is None:
+                continue
+            with open(os.path.join(directory, name), "rb") as f:
+                asset = Asset(name, f.read(), media_type)
+            self.by_name[name] = asset
+            self.routes[asset.hashed_name] = (asset, IMMUTABLE)
+            self.routes[name] = (asset, REVALIDATE)
+
+    def url(self, name):
+        return self.by_name[name].url
+
+    def lookup(self, filename):
+        # -> (asset, cache-control) or None
+        return self.routes.get(filename)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return etag in candidates or f"W/{etag}" in candidates
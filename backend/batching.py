@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import numpy as np
+
+from backend.metrics import Histogram, LATENCY_BUCKETS, SIZE_BUCKETS
+
+# ==========================
+# MICRO-BATCHING
+# ==========================
+# Concurrent single-row calls are parked for at most `window_ms` (or until
+# `max_rows` have arrived, whichever comes first), stacked into one matrix
+# and scored with a single model call. Each caller gets its own row back.
+
+
+class MicroBatcher:
+    def __init__(self, predict, window_ms=2.0, max_rows=64):
+        # predict: async callable, float matrix (n, k) -> n probabilities
+        self.predict = predict
+        self.window = window_ms / 1000.0
+        self.max_rows = max(1, int(max_rows))
+
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, row):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        for _, _, queued_at in batch:
+            self.queue_wait.observe(started - queued_at)
+        self.batch_size.observe(len(batch))
+
+        X = np.array([row for row, _, _ in batch], dtype=np.float64)
+        try:
+            probs = await self.predict(X)
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _), prob in zip(batch, probs):
+            # A caller may have gone away (client disconnect) meanwhile
+            if not future.done():
+                future.set_result(float(prob))
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_rows": self.max_rows,
+            "pending": len(self._pending),
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
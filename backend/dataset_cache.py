@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+# ==========================
+# COLUMNAR DATASET CACHE
+# ==========================
+# The first read of a CSV converts it into one .npy file per column plus a
+# manifest keyed by the source's size, mtime and sha256. Later reads
+# memory-map those files instead of parsing text, so every worker on the
+# host shares the same page cache.
+#
+#   creditcard.csv  ->  .cache/creditcard.csv.cols/manifest.json
+#                                                  /c000.npy, c001.npy ...
+#
+# Floats are stored as float32 only when the round-trip is exact, integers
+# are downcast to the smallest type that holds them, and strings become
+# integer category codes.
+
+CACHE_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+def cache_dir_for(path, cache_root=None):
+    path = os.path.abspath(path)
+    cache_root = cache_root or os.path.join(os.path.dirname(path), ".cache")
+    return os.path.join(cache_root, os.path.basename(path) + ".cols")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(cache_dir, manifest):
+    tmp = os.path.join(cache_dir, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, MANIFEST))
+
+
+def _is_fresh(path, cache_dir, manifest):
+    st = os.stat(path)
+    if manifest["size"] != st.st_size:
+        return False
+    if manifest["mtime_ns"] == st.st_mtime_ns:
+        return True
+
+    # Touched but maybe not changed (copied, re-checked-out): compare content
+    if file_sha256(path) != manifest["sha256"]:
+        return False
+    manifest["mtime_ns"] = st.st_mtime_ns
+    _write_manifest(cache_dir, manifest)
+    return True
+
+
+def _compact(series):
+    values = series.to_numpy()
+
+    if values.dtype.kind == "f":
+        as32 = values.astype(np.float32)
+        if np.array_equal(as32.astype(values.dtype), values, equal_nan=True):
+            return as32, None
+        return values.astype(np.float64), None
+
+    if values.dtype.kind in "iu":
+        return pd.to_numeric(series, downcast="integer").to_numpy(), None
+
+    if values.dtype.kind == "b":
+        return values, None
+
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(np.int32), [str(c) for c in categories]
+
+
+def build_cache(path, cache_dir):
+    started = time.perf_counter()
+    st = os.stat(path)
+    df = pd.read_csv(path)
+
+    # Build next to the final location, then rename into place so a reader
+    # (or a concurrently starting worker) never sees a half-written cache.
+    tmp_dir = f"{cache_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        values, categories = _compact(df[name])
+        filename = f"c{i:03d}.npy"
+        np.save(os.path.join(tmp_dir, filename), np.ascontiguousarray(values))
+        columns.append({
+            "name": str(name),
+            "file": filename,
+            "dtype": values.dtype.str,
+            "categories": categories,
+        })
+
+    _write_manifest(tmp_dir, {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(path),
+        "rows": len(df),
+        "columns": columns,
+        "build_seconds": time.perf_counter() - started,
+    })
+
+    stale = f"{cache_dir}.{os.getpid()}.old"
+    if os.path.exists(cache_dir):
+        os.rename(cache_dir, stale)
+    try:
+        os.rename(tmp_dir, cache_dir)
+    except OSError:
+        # Another process won the race; its cache is just as good
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(stale, ignore_errors=True)
+
+    return df
+
+
+def _load_cached(cache_dir, manifest, columns, mmap):
+    wanted = set(columns) if columns is not None else None
+    mmap_mode = "r" if mmap else None
+
+    data = {}
+    for col in manifest["columns"]:
+        if wanted is not None and col["name"] not in wanted:
+            continue
+        values = np.load(os.path.join(cache_dir, col["file"]), mmap_mode=mmap_mode)
+        if col["categories"] is not None:
+            values = pd.Categorical.from_codes(values, categories=col["categories"])
+        data[col["name"]] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+def load_csv(path, columns=None, cache_root=None, mmap=True):
+    cache_dir = cache_dir_for(path, cache_root)
+    manifest = _read_manifest(cache_dir)
+
+    if manifest is not None and _is_fresh(path, cache_dir, manifest):
+        return _load_cached(cache_dir, manifest, columns, mmap)
+
+    try:
+        df = build_cache(path, cache_dir)
+    except OSError:
+        # Read-only checkout or full disk: fall back to plain parsing
+        df = pd.read_csv(path)
+        return df if columns is None else df[list(columns)]
+
+    manifest = _read_manifest(cache_dir)
+    if manifest is None:
+        return df if columns is None else df[list(columns)]
+    return _load_cached(cache_dir, manifest, columns, mmap)
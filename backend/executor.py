@@ -0,0 +1,147 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+
+from backend.forest import ARTIFACT_SUFFIX, CompiledForest, pickle_path_for
+from backend.scoring import fraud_probabilities
+
+# ==========================
+# INFERENCE EXECUTOR
+# ==========================
+# Keeps CPU-bound predict_proba calls off the asyncio event loop. "thread"
+# shares the in-memory model with the app, "process" loads a private copy
+# of the model in each worker, "inline" runs on the loop (old behaviour).
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+class ExecutorBusy(Exception):
+    pass
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Process-pool workers keep their model in a module global
+_worker_model = None
+
+
+def load_model_file(model_path, compile_forest=False, compiled_max_rows=None):
+    if model_path.endswith(ARTIFACT_SUFFIX):
+        # Read-only mapping: all processes share one physical copy
+        return CompiledForest.load(model_path, max_rows=compiled_max_rows,
+                                   fallback_path=pickle_path_for(model_path))
+    model = joblib.load(model_path)
+    if compile_forest:
+        model = CompiledForest.from_sklearn(model, max_rows=compiled_max_rows)
+    return model
+
+
+def _init_worker(model_path, compile_forest, compiled_max_rows):
+    global _worker_model
+    _worker_model = load_model_file(model_path, compile_forest, compiled_max_rows)
+
+
+def _worker_predict(X):
+    return fraud_probabilities(_worker_model, X)
+
+
+class InferenceExecutor:
+    def __init__(self, predict, kind="thread", workers=0, max_pending=0,
+                 model_path=None, compile_forest=False, compiled_max_rows=None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"unknown executor kind {kind!r}, "
+                             f"expected one of {EXECUTOR_KINDS}")
+        if kind == "process" and model_path is None:
+            raise ValueError("process executor needs model_path")
+
+        # predict: sync callable used by the thread and inline executors
+        self.predict = predict
+        self.kind = kind
+        self.workers = workers or available_cores()
+        self.max_pending = max_pending or self.workers * 4
+        self.model_path = model_path
+        self.compile_forest = compile_forest
+        self.compiled_max_rows = compiled_max_rows
+
+        self._pool = None
+        self._in_flight = 0
+
+    def _new_pool(self, model_path=None):
+        if self.kind == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="greylock-infer",
+            )
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path or self.model_path, self.compile_forest,
+                      self.compiled_max_rows),
+        )
+
+    def _get_pool(self):
+        # Created lazily so forked server workers each build their own
+        if self._pool is None:
+            self._pool = self._new_pool()
+        return self._pool
+
+    async def prepare_model(self, model_path, warm_rows=None):
+        # Process workers hold their own model copy, so a new model means a
+        # new pool. It is started and warmed here, then handed to
+        # activate_model(); the old pool keeps serving meanwhile.
+        if self.kind != "process":
+            return None
+        pool = self._new_pool(model_path)
+        if warm_rows is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                await asyncio.gather(*(loop.run_in_executor(pool, _worker_predict, warm_rows)
+                                       for _ in range(self.workers)))
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        return model_path, pool
+
+    def activate_model(self, prepared):
+        self.model_path, pool = prepared
+        old, self._pool = self._pool, pool
+        if old is not None:
+            # Jobs already submitted to the old pool still complete
+            old.shutdown(wait=False)
+
+    async def run(self, X):
+        if self.kind == "inline":
+            return self.predict(X)
+
+        if self._in_flight >= self.max_pending:
+            raise ExecutorBusy(f"{self._in_flight} inference jobs pending")
+
+        fn = self.predict if self.kind == "thread" else _worker_predict
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._get_pool(), fn, X)
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+        }
@@ -0,0 +1,357 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+# ==========================
+# COMPILED RANDOM FOREST
+# ==========================
+# Flattens every tree of a fitted sklearn RandomForestClassifier into one
+# set of contiguous node arrays and evaluates all trees for a whole batch
+# with a handful of NumPy gathers per depth level. No input validation, no
+# joblib dispatch, no per-estimator Python loop.
+#
+# The walk advances one flat (tree, row) cursor array a level at a time
+# and periodically drops cursors that reached a leaf, so the work tracks
+# the paths still descending rather than trees x rows x max_depth.
+#
+# Per-call overhead is tiny, but the per-row cost is a few times that of
+# sklearn's Cython traversal and its temporaries grow with trees x rows, so
+# batches above `max_rows` are handed to the original sklearn model when
+# one is available, or else walked `max_rows` rows at a time.
+
+FRAUD_CLASS = 1
+
+logger = logging.getLogger("greylock")
+
+# ==========================
+# ON-DISK ARTIFACT
+# ==========================
+# A single read-only file that every worker maps instead of unpickling:
+#
+#   b"GLFOREST" | u32 format version | u32 header length | JSON header
+#   then each array, 64-byte aligned, at the offset listed in the header
+#
+# Only what the evaluator needs is kept (no impurity, sample counts or
+# class matrices): uint8/int32 feature, float32 threshold, int32 children,
+# float32 P(fraud) and int32 tree roots. Float32 thresholds are rounded
+# *down*, which keeps `x32 <= threshold` decisions identical to sklearn's
+# float64 comparison for every float32 input.
+#
+# The pickle it was exported from stays next to it (fraud_model.pkl for
+# fraud_model.forest) and its sha256 is recorded in the header metadata;
+# a loaded artifact unpickles it only for its first batch above max_rows,
+# and only if the checksum still matches.
+
+ARTIFACT_MAGIC = b"GLFOREST"
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".forest"
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+
+
+def _align(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _threshold_float32(threshold):
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    t32[too_high] = np.nextafter(t32[too_high], np.float32(-np.inf))
+    return t32
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, children, value, roots, max_depth,
+                 n_features, fallback=None, max_rows=None, fallback_path=None):
+        self.feature = feature        # intp (nodes,), 0 for leaves
+        self.threshold = threshold    # float64 (nodes,)
+        self.children = children      # intp (nodes, 2): [left, right]
+        self.value = value            # float64 (nodes,), P(fraud) at node
+        self.roots = roots            # int32 (trees,)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.is_leaf = children[:, 0] == np.arange(len(children))
+        self.fallback = fallback
+        self.max_rows = max_rows
+        self.metadata = {}
+        # Pickle to load as the fallback on first need (artifacts only)
+        self.fallback_path = fallback_path
+        self._fallback_lock = threading.Lock()
+
+    @classmethod
+    def from_sklearn(cls, model, fraud_class=FRAUD_CLASS, max_rows=None):
+        features, thresholds, children, values, roots = [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            own = np.arange(offset, offset + n)
+            leaf = tree.children_left == -1
+
+            left = np.where(leaf, own, tree.children_left + offset)
+            right = np.where(leaf, own, tree.children_right + offset)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1)
+            totals[totals == 0] = 1.0
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            children.append(np.column_stack([left, right]))
+            values.append(counts[:, fraud_class] / totals)
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+            fallback=model if max_rows is not None else None,
+            max_rows=max_rows,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def fraud_proba(self, X):
+        # sklearn trees compare float32 inputs against their thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected shape (n, {self.n_features}), got {X.shape}")
+
+        n, k = X.shape
+        flat_X = X.ravel()
+        children = self.children.ravel()
+
+        # Cursor j walks tree j // n for row j % n. Leaves are self-loops,
+        # so finished cursors can keep stepping harmlessly; the cursor set
+        # is only compacted once more than half of it has finished.
+        node = np.repeat(self.roots.astype(np.intp), n)
+        row_base = np.tile(np.arange(n, dtype=np.intp) * k, self.n_trees)
+        live = None
+
+        while True:
+            at = node if live is None else node[live]
+            base = row_base if live is None else row_base[live]
+
+            go_right = flat_X[base + self.feature[at]] > self.threshold[at]
+            at = children[(at << 1) + go_right]
+            if live is None:
+                node = at
+            else:
+                node[live] = at
+
+            descending = ~self.is_leaf[at]
+            remaining = np.count_nonzero(descending)
+            if remaining == 0:
+                break
+            if remaining * 2 < len(at):
+                keep = np.flatnonzero(descending)
+                live = keep if live is None else live[keep]
+
+        return self.value[node].reshape(self.n_trees, n).mean(axis=0, dtype=np.float64)
+
+    def predict_proba(self, X):
+        # Drop-in for the sklearn method (binary models only)
+        if self.max_rows is not None and len(X) > self.max_rows:
+            fallback = self._get_fallback()
+            if fallback is not None:
+                return fallback.predict_proba(X)
+            p = np.concatenate([self.fraud_proba(X[i:i + self.max_rows])
+                                for i in range(0, len(X), self.max_rows)])
+        else:
+            p = self.fraud_proba(X)
+        return np.column_stack([1.0 - p, p])
+
+    def _get_fallback(self):
+        if self.fallback is None and self.fallback_path is not None:
+            with self._fallback_lock:
+                if self.fallback_path is not None:
+                    self.fallback = load_fallback(self.fallback_path,
+                                                  self.metadata.get("pickle_sha256"))
+                    self.fallback_path = None
+        return self.fallback
+
+
+    def save(self, path, metadata=None):
+        feature_dtype = np.uint8 if self.n_features < 256 else np.int32
+        arrays = {
+            "feature": self.feature.astype(feature_dtype),
+            "threshold": _threshold_float32(np.asarray(self.threshold, dtype=np.float64)),
+            "children": self.children.astype(np.int32),
+            "value": self.value.astype(np.float32),
+            "roots": self.roots.astype(np.int32),
+        }
+
+        header = {
+            "n_trees": self.n_trees,
+            "n_nodes": self.n_nodes,
+            "n_features": self.n_features,
+            "max_depth": self.max_depth,
+            "metadata": metadata or {},
+            "arrays": {},
+        }
+
+        # Array offsets depend on the header length and vice versa; grow the
+        # reserved header area until the serialised header fits in it.
+        data_start = _align(_PREAMBLE.size)
+        while True:
+            offset = data_start
+            for name in _ARRAYS:
+                a = arrays[name]
+                header["arrays"][name] = {"dtype": a.dtype.str, "shape": list(a.shape),
+                                          "offset": offset}
+                offset = _align(offset + a.nbytes)
+            raw_header = json.dumps(header).encode()
+            if _PREAMBLE.size + len(raw_header) <= data_start:
+                break
+            data_start = _align(_PREAMBLE.size + len(raw_header))
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_PREAMBLE.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(raw_header)))
+            f.write(raw_header)
+            for name in _ARRAYS:
+                f.seek(header["arrays"][name]["offset"])
+                f.write(np.ascontiguousarray(arrays[name]).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, use_mmap=True, max_rows=None, fallback_path=None):
+        with open(path, "rb") as f:
+            if use_mmap:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buf = f.read()
+
+        magic, version, header_len = _PREAMBLE.unpack_from(buf, 0)
+        if magic != ARTIFACT_MAGIC:
+            raise ValueError(f"{path} is not a greylock forest artifact")
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"{path} has format version {version}, "
+                             f"expected {ARTIFACT_VERSION}")
+        header = json.loads(bytes(buf[_PREAMBLE.size:_PREAMBLE.size + header_len]))
+
+        arrays = {}
+        for name in _ARRAYS:
+            spec = header["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(buf, dtype=dtype, count=count,
+                                         offset=spec["offset"]).reshape(spec["shape"])
+
+        forest = cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=header["max_depth"],
+            n_features=header["n_features"],
+            max_rows=max_rows,
+            fallback_path=fallback_path if max_rows is not None else None,
+        )
+        forest.metadata = header["metadata"]
+        return forest
+
+
+def pickle_path_for(artifact_path):
+    # train_model.py exports fraud_model.forest next to fraud_model.pkl
+    return artifact_path[:-len(ARTIFACT_SUFFIX)] + ".pkl"
+
+
+def load_fallback(path, expected_sha256):
+    # The sklearn model an artifact was exported from, or None when it is
+    # missing or has been replaced since (the artifact then walks large
+    # batches in chunks instead)
+    import joblib
+    from backend.dataset_cache import file_sha256
+
+    try:
+        if expected_sha256 is None or file_sha256(path) != expected_sha256:
+            logger.warning("%s does not match the artifact, large batches stay compiled", path)
+            return None
+        return joblib.load(path)
+    except OSError as exc:
+        logger.warning("no sklearn fallback for the artifact: %s", exc)
+        return None
+
+
+def preferred_model_path(pickle_path, artifact_path):
+    # The mmap-able export wins when it is at least as new as the pickle
+    if not os.path.exists(artifact_path):
+        return pickle_path
+    if os.path.exists(pickle_path) and os.path.getmtime(artifact_path) < os.path.getmtime(pickle_path):
+        return pickle_path
+    return artifact_path
+
+
+def verify_parity(compiled, model, X, atol=1e-9):
+    expected = model.predict_proba(X)[:, FRAUD_CLASS]
+    got = compiled.fraud_proba(X)
+    worst = float(np.max(np.abs(expected - got))) if len(X) else 0.0
+    if worst > atol:
+        raise ValueError(f"compiled forest deviates from sklearn by {worst:.3g} "
+                         f"(tolerance {atol:.3g})")
+    return worst
+
+
+def synthetic_rows(n, n_features=3, seed=0):
+    # Amount-like first column, standard-normal PCA-like features after it
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, n_features))
+    X[:, 0] = rng.exponential(90.0, size=n)
+    return X
+
+
+def _time_per_call(fn, X, repeat):
+    fn(X)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - started) / repeat
+
+
+if __name__ == "__main__":
+    # python -m backend.forest [path/to/fraud_model.pkl]
+    import joblib
+
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    path = sys.argv[1] if len(sys.argv) > 1 else "backend/model/fraud_model.pkl"
+    model = joblib.load(path)
+    compiled = CompiledForest.from_sklearn(model)
+    print(f"{compiled.n_trees} trees, {compiled.n_nodes} nodes, "
+          f"max depth {compiled.max_depth}")
+
+    X = synthetic_rows(10_000, compiled.n_features)
+    print(f"parity: max |diff| = {verify_parity(compiled, model, X):.3g}")
+
+    for n, repeat in ((1, 200), (64, 50), (256, 20), (1024, 10), (10_000, 3)):
+        batch = X[:n]
+        sk = _time_per_call(model.predict_proba, batch, repeat)
+        cf = _time_per_call(compiled.fraud_proba, batch, repeat)
+        print(f"batch {n:>6}: sklearn {sk * 1e6:10.1f} us  "
+              f"compiled {cf * 1e6:10.1f} us  speedup {sk / cf:6.1f}x")
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# ==========================
+# INSURANCE CLAIM STATISTICS
+# ==========================
+# insurance.csv (or the built-in fallback) is normalized to one schema and
+# reduced once to an immutable InsuranceStats snapshot: mean, quantiles and
+# per-segment aggregates of the claim amount. Requests only read
+# store.current. A background task re-reads the file when its mtime
+# changes, builds a new snapshot off the event loop and swaps the
+# reference, so a request never waits on a recompute.
+
+logger = logging.getLogger("greylock")
+
+# canonical column -> accepted source names, first match wins
+COLUMN_ALIASES = {
+    "claim_amount": ["total_claim_amount", "ClaimAmount", "claim_amount"],
+    "num_claims": ["number_of_claims", "NumClaims", "num_claims"],
+    "fraud_reported": ["fraud_reported", "FraudReported"],
+    "segment": ["segment", "incident_type", "IncidentType"],
+}
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+
+# Used when insurance.csv is missing
+FALLBACK_INSURANCE = pd.DataFrame({
+    "ClaimAmount": [5000, 20000, 40000],
+    "NumClaims": [1, 2, 5],
+    "FraudReported": [0, 0, 1],
+})
+
+TRUE_STRINGS = {"y", "yes", "true", "1"}
+
+
+def normalize_insurance(df):
+    out = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        source = next((a for a in aliases if a in df.columns), None)
+        if source is not None:
+            out[name] = df[source]
+    if "claim_amount" not in out:
+        raise ValueError(f"insurance data needs one of {COLUMN_ALIASES['claim_amount']}")
+
+    norm = pd.DataFrame({"claim_amount": pd.to_numeric(out["claim_amount"], errors="coerce")})
+    if "num_claims" in out:
+        norm["num_claims"] = pd.to_numeric(out["num_claims"], errors="coerce")
+    if "fraud_reported" in out:
+        flag = out["fraud_reported"]
+        if pd.api.types.is_numeric_dtype(flag):
+            norm["fraud_reported"] = flag.astype(float) > 0
+        else:
+            norm["fraud_reported"] = flag.astype(str).str.strip().str.lower().isin(TRUE_STRINGS)
+    if "segment" in out:
+        norm["segment"] = out["segment"].astype(str)
+    return norm[norm["claim_amount"].notna()]
+
+
+def _claim_summary(amounts):
+    q = np.quantile(amounts, list(QUANTILES.values())) if len(amounts) else [0.0] * len(QUANTILES)
+    return {
+        "count": int(len(amounts)),
+        "mean": float(amounts.mean()) if len(amounts) else 0.0,
+        "std": float(amounts.std()) if len(amounts) else 0.0,
+        **{name: float(v) for name, v in zip(QUANTILES, q)},
+    }
+
+
+class InsuranceStats:
+    def __init__(self, df, source, mtime_ns=None):
+        amounts = df["claim_amount"].to_numpy(dtype=np.float64)
+        self.source = source
+        self.mtime_ns = mtime_ns
+        self.computed_at = time.time()
+        self.claims = _claim_summary(amounts)
+        self.mean = self.claims["mean"]
+
+        self.fraud_rate = (float(df["fraud_reported"].mean())
+                           if "fraud_reported" in df and len(df) else None)
+        self.num_claims_mean = (float(df["num_claims"].mean())
+                                if "num_claims" in df and len(df) else None)
+
+        self.segments = {}
+        if "segment" in df:
+            for segment, group in df.groupby("segment", sort=True, observed=True):
+                summary = _claim_summary(group["claim_amount"].to_numpy(dtype=np.float64))
+                if "fraud_reported" in group:
+                    summary["fraud_rate"] = float(group["fraud_reported"].mean())
+                self.segments[segment] = summary
+
+    def rule_fields(self):
+        # Values the insurance rule set may reference (see rules.RULE_FIELDS)
+        return {"avg_claim": self.mean,
+                **{f"claim_{name}": self.claims[name] for name in QUANTILES}}
+
+    def as_dict(self):
+        return {
+            "source": self.source,
+            "mtime_ns": self.mtime_ns,
+            "computed_at": self.computed_at,
+            "claims": self.claims,
+            "fraud_rate": self.fraud_rate,
+            "num_claims_mean": self.num_claims_mean,
+            "segments": self.segments,
+        }
+
+
+class InsuranceStatsStore:
+    def __init__(self, path, read=pd.read_csv):
+        self.path = path
+        self.read = read
+        self.current = None
+        self.refreshes = 0
+        self.last_error = None
+
+    def _mtime_ns(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def compute(self):
+        mtime_ns = self._mtime_ns()
+        if mtime_ns is None:
+            return InsuranceStats(normalize_insurance(FALLBACK_INSURANCE), "fallback")
+        return InsuranceStats(normalize_insurance(self.read(self.path)), self.path, mtime_ns)
+
+    def load(self):
+        self.current = self.compute()
+        return self.current
+
+    def changed(self):
+        return self.current is None or self._mtime_ns() != self.current.mtime_ns
+
+    async def refresh_if_changed(self):
+        if not self.changed():
+            return False
+        try:
+            stats = await asyncio.to_thread(self.compute)
+        except Exception as exc:
+            # A half-written or malformed file: keep serving the old stats
+            if self.last_error != repr(exc):
+                logger.error("insurance stats refresh failed, keeping previous: %r", exc)
+            self.last_error = repr(exc)
+            return False
+        self.current = stats
+        self.refreshes += 1
+        self.last_error = None
+        logger.info("insurance stats refreshed from %s", stats.source)
+        return True
+
+    async def watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh_if_changed()
+
+    def stats(self):
+        return {
+            "refreshes": self.refreshes,
+            "last_error": self.last_error,
+            **(self.current.as_dict() if self.current is not None else {}),
+        }
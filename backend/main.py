@@ -1,259 +1,437 @@
-from fastapi import FastAPI, Form
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
 import pandas as pd
 import numpy as np
-import joblib
+import asyncio
+import hmac
+import logging
 import os
+import time
+
+from backend.scoring import (
+    CREDIT_FEATURES,
+    SALAMI_AMOUNT,
+    credit_matrix,
+    credit_labels,
+    fraud_probabilities,
+)
+from backend.assets import STATIC_PREFIX, AssetTable, etag_matches
+from backend.batching import MicroBatcher
+from backend.dataset_cache import load_csv
+from backend.executor import InferenceExecutor, ExecutorBusy
+from backend.insurance_stats import InsuranceStatsStore
+from backend.model_manager import ModelManager, load_model
+from backend.shadow import DELTA_BUCKETS, ShadowScorer
+from backend.pages import PrerenderedPage, ResultTemplate
+from backend.responses import FastJSONResponse
+from backend.metrics import (
+    SIZE_BUCKETS,
+    Registry,
+    RequestMetricsMiddleware,
+    register_process_metrics,
+)
+from backend.prediction_cache import PredictionCache
+from backend.rules import RuleEngine
+from backend.velocity import VelocityStore
+from backend.streaming import (
+    DuplexStreamingResponse,
+    StreamFormatError,
+    StreamScorer,
+    detect_format,
+)
+from backend.forest import ARTIFACT_SUFFIX, synthetic_rows
+from backend import settings
+
+
+logger = logging.getLogger("greylock")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if settings.BACKGROUND_LOAD:
+        # Bind immediately; /readyz flips once everything is loaded and hot
+        loader = asyncio.create_task(load_in_background())
+    else:
+        loader = None
+        await warm_up(settings.WARMUP_ROUNDS)
+        readiness["state"] = "ready"
+    watchers = []
+    if settings.RULES_RELOAD_SECONDS > 0:
+        watchers.append(asyncio.create_task(watch_rules(settings.RULES_RELOAD_SECONDS)))
+    if settings.MODEL_RELOAD_SECONDS > 0:
+        watchers.append(asyncio.create_task(watch_models(settings.MODEL_RELOAD_SECONDS)))
+    if settings.INSURANCE_RELOAD_SECONDS > 0:
+        watchers.append(asyncio.create_task(
+            insurance_stats.watch(settings.INSURANCE_RELOAD_SECONDS)))
+    yield
+    for task in [loader] + watchers:
+        if task is not None:
+            task.cancel()
+    inference.shutdown()
+    if shadow is not None:
+        shadow.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# ==========================
+# METRICS
+# ==========================
+# Prometheus text exposition on /metrics. Hot-path children are resolved
+# once here so recording a sample is a bisect and an add under a lock.
+registry = Registry()
+register_process_metrics(registry)
+
+http_requests = registry.counter(
+    "greylock_http_requests_total", "HTTP requests by route template, method and status.",
+    labelnames=["route", "method", "status"])
+http_latency = registry.histogram(
+    "greylock_http_request_duration_seconds", "HTTP request latency by route template.",
+    labelnames=["route", "method"])
+stage_latency = registry.histogram(
+    "greylock_stage_duration_seconds", "Time spent in each stage of a request handler.",
+    labelnames=["handler", "stage"])
+inference_latency = registry.histogram(
+    "greylock_model_inference_seconds", "Model call latency as seen by the event loop.")
+inference_rows = registry.histogram(
+    "greylock_model_inference_rows", "Rows scored per model call.", buckets=SIZE_BUCKETS)
+batcher_sizes = registry.histogram(
+    "greylock_batcher_batch_size", "Rows per micro-batch.", buckets=SIZE_BUCKETS)
+batcher_wait = registry.histogram(
+    "greylock_batcher_queue_wait_seconds", "Time a row waits for its micro-batch.")
+shadow_latency = registry.histogram(
+    "greylock_shadow_latency_seconds", "Sampled model call latency, primary vs candidate.",
+    labelnames=["model"])
+shadow_delta = registry.histogram(
+    "greylock_shadow_abs_delta", "Absolute candidate minus primary fraud probability.",
+    buckets=DELTA_BUCKETS)
+
+
+
+def handler_stages(handler):
+    return {stage: stage_latency.labels(handler, stage)
+            for stage in ("parse", "account_features", "inference", "render")}
+
+
+CREDIT_STAGES = handler_stages("credit_predict")
+CREDIT_API_STAGES = handler_stages("credit_score_v1")
+INFERENCE_SECONDS = inference_latency.labels()
+INFERENCE_ROWS = inference_rows.labels()
+
+app.add_middleware(RequestMetricsMiddleware, requests=http_requests, latency=http_latency)
 
 # ==========================
 # LOAD MODEL + DATASETS
 # ==========================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, "model", "fraud_model.pkl")
+ARTIFACT_PATH = os.path.join(BASE_DIR, "model", "fraud_model" + ARTIFACT_SUFFIX)
 CREDIT_PATH = os.path.join(BASE_DIR, "model", "creditcard.csv")
 INSURANCE_PATH = os.path.join(BASE_DIR, "model", "insurance.csv")
 
-model = joblib.load(MODEL_PATH)
-credit_data = pd.read_csv(CREDIT_PATH)
-
-# Safe insurance loading
-if os.path.exists(INSURANCE_PATH):
-    insurance_data = pd.read_csv(INSURANCE_PATH)
-else:
-    insurance_data = pd.DataFrame({
-        "ClaimAmount":[5000,20000,40000],
-        "NumClaims":[1,2,5],
-        "FraudReported":[0,0,1]
-    })
+read_dataset = load_csv if settings.DATASET_CACHE else pd.read_csv
 
-# ==========================
-# GLOBAL STYLE + MATRIX JS
-# ==========================
-STYLE = """
-<style>
-body {
-    margin: 0;
-    color: #00ff99;
-    font-family: 'Courier New', monospace;
-    overflow: hidden;
-    background: none;
-}
-
-
-body::before {
-    content: "";
-    position: fixed;
-    top: 0;
-    left: 0;
-    width: 100%;
-    height: 100%;
-
-    background: url('https://th.bing.com/th/id/OIP.GN6pJxkDWaTA0ZGB42RY1AHaFj?w=148&h=180&c=7&r=0&o=7&dpr=1.1&pid=1.7&rm=3')
-                center center / cover no-repeat;
-
-    filter: brightness(50%) contrast(120%);
-    z-index: -2;
-}
-
-/* MATRIX CANVAS */
-canvas {
-    position: fixed;
-    top: 0;
-    left: 0;
-    z-index: -1;
-}
-/* FULL SCREEN MATRIX */
-canvas {
-    position:fixed;
-    top:0;
-    left:0;
-    z-index:-1;
-}
-
-/* TITLE */
-.title {
-    text-align:center;
-    font-size:100px;
-    margin-top:60px;
-    letter-spacing:12px;
-    text-shadow:0 0 20px #00ff99;
-}
-
-/* CARD */
-.card {
-    width: 420px;
-    margin: 40px auto;
-    padding: 30px;
-    background: rgba(0, 0, 0, 0.3); /* light glass, not solid */
-    backdrop-filter: blur(8px);
-    border: 1px solid #00ff99;
-    box-shadow: 0 0 40px rgba(0,255,153,0.6);
-    text-align: center;
-}
-
-.card:hover {
-    box-shadow:0 0 40px rgba(0,255,153,0.7);
-}
-
-/* INPUTS */
-input {
-    width:90%;
-    padding:12px;
-    margin:12px 0;
-    background:black;
-    border:1px solid #00ff99;
-    color:#00ff99;
-    border-radius:0px;
-    outline:none;
-}
-
-input:focus {
-    box-shadow:0 0 10px #00ff99;
-}
-
-/* BUTTON */
-button {
-    padding:12px 30px;
-    background:black;
-    color:#00ff99;
-    border:1px solid #00ff99;
-    border-radius:0px;
-    cursor:pointer;
-    transition:0.3s;
-}
-
-button:hover {
-    background:#00ff99;
-    color:black;
-}
-
-.button {
-    padding:12px 30px;
-    border:1px solid #00ff99;
-    color:#00ff99;
-    text-decoration:none;
-    display:inline-block;
-    margin-top:20px;
-    border-radius:0px;
-}
-
-.button:hover {
-    background:#00ff99;
-    color:black;
-}
-
-.progress {
-    width:100%;
-    height:20px;
-    background:black;
-    border:1px solid #00ff99;
-    margin-top:15px;
-}
-
-.progress-bar {
-    height:100%;
-    background:#00ff99;
-    width:0%;
-    transition:width 1s ease-in-out;
-    
- @keyframes screenFlicker {
-    0% { opacity: 1; }
-    50% { opacity: 0.97; }
-    100% { opacity: 1; }
-}
-
-body {
-    animation: screenFlicker 0.15s infinite;
-}
-}
-</style>
+insurance_stats = InsuranceStatsStore(INSURANCE_PATH, read=read_dataset)
 
-<canvas id="matrix"></canvas>
+prediction_cache = PredictionCache(
+    max_size=settings.CACHE_SIZE,
+    ttl=settings.CACHE_TTL,
+    precision=settings.CACHE_PRECISION if settings.CACHE_PRECISION >= 0 else None,
+)
 
-<script>
-var c = document.getElementById("matrix");
-var ctx = c.getContext("2d");
+# Per-account transaction windows feeding the credit rules
+velocity = VelocityStore(
+    SALAMI_AMOUNT,
+    max_accounts=settings.VELOCITY_MAX_ACCOUNTS,
+    idle_seconds=settings.VELOCITY_IDLE_SECONDS or None,
+)
 
-c.height = window.innerHeight;
-c.width = window.innerWidth;
+# Decision rules, compiled at import so a broken rules file fails the boot
+rules = RuleEngine(settings.RULES_PATH)
 
-let modeIndex = 0;
-const modes = [
-    "01",                                   // A - Binary
-    "0123456789ABCDEF",                     // B - Hex
-    "!@#$%^&*(){}[]<>?/|+-=",               // C - Symbols
-    "01GRAYLOCK"                            // D - Brand mix
-];
 
-let letters = modes[modeIndex].split("");
-let fontSize = 14;
-let columns = c.width / fontSize;
-let drops = [];
+async def watch_rules(interval):
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(rules.reload_if_changed)
 
-for (let x = 0; x < columns; x++)
-    drops[x] = 1;
+async def watch_models(interval):
+    # Not before the initial load has finished: until then there is no
+    # model to compare against and no reference rows to validate with
+    while readiness["state"] != "ready":
+        if readiness["state"] == "failed":
+            return
+        await asyncio.sleep(interval)
+    await models.watch(interval)
 
-// Change mode every 10 seconds
-setInterval(() => {
-    modeIndex = (modeIndex + 1) % modes.length;
-    letters = modes[modeIndex].split("");
-}, 10000);
+# loading -> warming -> ready, or failed
+readiness = {"state": "loading", "error": None, "load_seconds": None}
 
-function draw() {
-    ctx.fillStyle = "rgba(0,0,0,0.08)";
-    ctx.fillRect(0,0,c.width,c.height);
 
-    ctx.fillStyle = "#00ff99";
-    ctx.font = fontSize + "px monospace";
+class ServiceNotReady(Exception):
+    pass
 
-    for (let i=0; i<drops.length; i++) {
-        let text = letters[Math.floor(Math.random()*letters.length)];
-        ctx.fillText(text, i*fontSize, drops[i]*fontSize);
 
-        if (drops[i]*fontSize > c.height && Math.random() > 0.975)
-            drops[i] = 0;
+def prepare_candidate(candidate):
+    # Warm a model before it takes traffic: process workers get a fresh
+    # pool on the new file, thread/inline evaluators a few direct calls
+    warm_rows = synthetic_rows(settings.BATCH_MAX_ROWS)
+    if inference.kind == "process":
+        return inference.prepare_model(candidate.path, warm_rows)
+    return asyncio.to_thread(warm_model, candidate.model, warm_rows)
 
-        drops[i]++;
-    }
-}
 
-setInterval(draw,33);
+def warm_model(model, rows):
+    for _ in range(max(1, settings.WARMUP_ROUNDS)):
+        fraud_probabilities(model, rows[:1])
+        fraud_probabilities(model, rows)
 
-function playBeep() {
-    const ctx = new (window.AudioContext || window.webkitAudioContext)();
-    const oscillator = ctx.createOscillator();
-    const gainNode = ctx.createGain();
 
-    oscillator.type = "square";
-    oscillator.frequency.setValueAtTime(800, ctx.currentTime);
-    gainNode.gain.setValueAtTime(0.05, ctx.currentTime);
+def commit_candidate(candidate, prepared):
+    # prepared is None for the first load (no pool yet) and for thread or
+    # inline executors, which pick the model up from models.current
+    if prepared is not None:
+        inference.activate_model(prepared)
+    prediction_cache.set_model_version(candidate.version)
 
-    oscillator.connect(gainNode);
-    gainNode.connect(ctx.destination);
 
-    oscillator.start();
-    oscillator.stop(ctx.currentTime + 0.1);
-}
+models = ModelManager(
+    MODEL_PATH,
+    ARTIFACT_PATH,
+    use_artifact=settings.MODEL_ARTIFACT,
+    compile_forest=settings.COMPILED_FOREST,
+    compiled_max_rows=settings.COMPILED_MAX_ROWS,
+    prepare=prepare_candidate,
+    commit=commit_candidate,
+)
 
-// Random eerie beeps every 3-8 seconds
-setInterval(() => {
-    if (Math.random() > 0.5) {
-        playBeep();
-    }
-}, Math.random() * 5000 + 3000);
 
+def load_resources():
+    started = time.perf_counter()
+
+    # creditcard.csv only supplies reference rows: every model, this one
+    # and any reloaded later, must score these
+    credit_data = read_dataset(CREDIT_PATH)
+    models.reference_rows = np.vstack([
+        credit_data[CREDIT_FEATURES].to_numpy(dtype=np.float64)[:2048],
+        synthetic_rows(2048),
+    ])
+    models.load_initial()
+
+    # Falls back to a small built-in table when insurance.csv is missing
+    insurance_stats.load()
 
-</script>
+    if settings.SHADOW_MODEL:
+        try:
+            install_shadow(load_shadow_model(settings.SHADOW_MODEL), settings.SHADOW_SAMPLE_RATE)
+        except Exception:
+            logger.exception("shadow model %s not loaded, shadow scoring off",
+                             settings.SHADOW_MODEL)
+
+    readiness["load_seconds"] = time.perf_counter() - started
+
+
+# ==========================
+# SHADOW SCORING
+# ==========================
+shadow = None
+
+
+def load_shadow_model(name):
+    # Candidates must sit next to the live model: loading a pickle runs
+    # code, so arbitrary paths are not accepted
+    model_dir = os.path.dirname(MODEL_PATH)
+    path = os.path.realpath(os.path.join(model_dir, name))
+    if os.path.dirname(path) != os.path.realpath(model_dir):
+        raise ValueError(f"shadow model must be a file in {model_dir}")
+    return load_model(path, models.reference_rows, settings.COMPILED_FOREST,
+                      settings.COMPILED_MAX_ROWS)
+
+
+def install_shadow(loaded, sample_rate):
+    global shadow
+    previous = shadow
+    shadow = None if loaded is None else ShadowScorer(
+        loaded,
+        sample_rate=sample_rate,
+        threshold=settings.SHADOW_THRESHOLD,
+        kind=settings.SHADOW_EXECUTOR,
+        workers=settings.SHADOW_WORKERS,
+        max_pending=settings.SHADOW_MAX_PENDING,
+        compile_forest=settings.COMPILED_FOREST,
+        compiled_max_rows=settings.COMPILED_MAX_ROWS,
+    )
+    if previous is not None:
+        previous.shutdown()
+
+    # Histograms belong to the scorer; point the families at the new one
+    shadow_latency.clear()
+    shadow_delta.clear()
+    if shadow is not None:
+        shadow_latency.attach(shadow.primary_latency, "primary")
+        shadow_latency.attach(shadow.candidate_latency, "candidate")
+        shadow_delta.attach(shadow.abs_delta)
+
+
+def require_ready():
+    if readiness["state"] != "ready":
+        raise ServiceNotReady(readiness["state"])
+
+
+if not settings.BACKGROUND_LOAD:
+    load_resources()
+
+# ==========================
+# CREDIT SCORING (MICRO-BATCHED, OFF THE EVENT LOOP)
+# ==========================
+def predict_fraud_sync(X):
+    # One read of models.current: a reload mid-call does not affect it
+    return fraud_probabilities(models.current.model, X)
+
+
+inference = InferenceExecutor(
+    predict_fraud_sync,
+    kind=settings.EXECUTOR_KIND,
+    workers=settings.EXECUTOR_WORKERS,
+    max_pending=settings.EXECUTOR_MAX_PENDING,
+    model_path=models.model_path(),
+    compile_forest=settings.COMPILED_FOREST,
+    compiled_max_rows=settings.COMPILED_MAX_ROWS,
+)
+
+
+async def predict_fraud(X):
+    started = time.perf_counter()
+    try:
+        fraud_probs = await inference.run(X)
+    finally:
+        elapsed = time.perf_counter() - started
+        INFERENCE_SECONDS.observe(elapsed)
+        INFERENCE_ROWS.observe(len(X))
+
+    # Warm-up traffic is synthetic, so only live calls are shadowed
+    if shadow is not None and readiness["state"] == "ready":
+        shadow.observe(X, fraud_probs, elapsed)
+    return fraud_probs
+
+
+credit_batcher = MicroBatcher(
+    predict_fraud,
+    window_ms=settings.BATCH_WINDOW_MS,
+    max_rows=settings.BATCH_MAX_ROWS,
+)
+batcher_sizes.attach(credit_batcher.batch_size)
+batcher_wait.attach(credit_batcher.queue_wait)
+
+
+async def warm_up(rounds):
+    # Synthetic transactions through the real scoring path so the first
+    # live request does not pay for cold caches or pool start-up. Each
+    # round sends one single-row job per worker plus one full batch.
+    readiness["state"] = "warming"
+    rng = np.random.default_rng(0)
+    for _ in range(rounds):
+        rows = np.column_stack([
+            rng.uniform(0, 500, settings.BATCH_MAX_ROWS),
+            rng.normal(size=settings.BATCH_MAX_ROWS),
+            rng.normal(size=settings.BATCH_MAX_ROWS),
+        ])
+        await asyncio.gather(*(predict_fraud(credit_matrix(rows[i:i + 1]))
+                               for i in range(min(inference.workers, len(rows)))))
+        await predict_fraud(credit_matrix(rows))
+
+
+async def load_in_background():
+    try:
+        await asyncio.to_thread(load_resources)
+        await warm_up(settings.WARMUP_ROUNDS)
+    except Exception as exc:
+        logger.exception("loading model/datasets failed")
+        readiness["state"] = "failed"
+        readiness["error"] = repr(exc)
+        return
+    readiness["state"] = "ready"
+
+
+def observe_parse(request, stages, entered):
+    # Body parsing and validation happen before the handler runs, so the
+    # parse stage is measured from the metrics middleware's request start
+    stages["parse"].observe(entered - getattr(request.state, "metrics_started", entered))
+
+
+async def score_credit(amount, v1, v2, stages, account=None):
+    # -> (fraud probability, label); the one credit path behind both the
+    # HTML form and the JSON API. The account's windows include this
+    # transaction, which is only recorded once it has been scored. The
+    # velocity store may wait on another worker's batch for its lock, so it
+    # is called off the event loop.
+    started = time.perf_counter()
+    now = time.time()
+    account_features = None
+    if account:
+        account_features = await asyncio.to_thread(velocity.features, account, amount, now)
+    features_done = time.perf_counter()
+    stages["account_features"].observe(features_done - started)
+
+    fraud_prob = await score_credit_row(amount, v1, v2)
+    stages["inference"].observe(time.perf_counter() - features_done)
+    if account:
+        await asyncio.to_thread(velocity.record, account, amount, now)
+
+    label = str(credit_labels([amount], [fraud_prob], rules["credit"], account_features)[0])
+    return fraud_prob, label
+
+
+async def score_credit_row(amount, v1, v2):
+    row = (amount, v1, v2)
+    model_version = prediction_cache.model_version
+    if prediction_cache.enabled:
+        cached = prediction_cache.get(row)
+        if cached is not None:
+            return cached
+
+    if settings.BATCH_ENABLED:
+        fraud_prob = await credit_batcher.submit(row)
+    else:
+        fraud_prob = float((await predict_fraud(credit_matrix([row])))[0])
+
+    if prediction_cache.enabled:
+        prediction_cache.put(row, fraud_prob, model_version)
+    return fraud_prob
+
+# ==========================
+# GLOBAL STYLE + MATRIX JS
+# ==========================
+# CSS and the matrix/beep script live in backend/static and are cached by
+# the browser; every page only carries these tags.
+assets = AssetTable()
+
+STYLE = f"""
+<link rel="stylesheet" href="{assets.url('greylock.css')}">
+<canvas id="matrix"></canvas>
+<script src="{assets.url('greylock.js')}" defer></script>
 """
 
+
+@app.get(STATIC_PREFIX + "/{filename}")
+async def static_asset(filename: str, request: Request):
+    found = assets.lookup(filename)
+    if found is None:
+        raise HTTPException(status_code=404)
+    asset, cache_control = found
+
+    headers = {"ETag": asset.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), asset.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(asset.body, media_type=asset.media_type, headers=headers)
+
 # ==========================
 # HOME
 # ==========================
-@app.get("/", response_class=HTMLResponse)
-async def home():
-    return HTMLResponse(f"""
+HOME_PAGE = PrerenderedPage(f"""
     {STYLE}
     <div class="title">GRAYLOCK</div>
     <div class="card">
@@ -263,16 +441,22 @@ async def home():
     </div>
     """)
 
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    return HOME_PAGE.response(request.headers)
+
 # ==========================
 # CREDIT PAGE
 # ==========================
-@app.get("/credit", response_class=HTMLResponse)
-async def credit_page():
-    return HTMLResponse(f"""
+MAX_ACCOUNT_LENGTH = 64
+
+CREDIT_PAGE = PrerenderedPage(f"""
     {STYLE}
     <div class="card">
         <h2>Credit Fraud Detection</h2>
         <form action="/credit-predict" method="post">
+            <input name="account" placeholder="Account / Card ID (optional)">
             <input name="amount" placeholder="Transaction Amount" required>
             <input name="v1" placeholder="Feature V1" required>
             <input name="v2" placeholder="Feature V2" required>
@@ -282,28 +466,7 @@ async def credit_page():
     </div>
     """)
 
-@app.post("/credit-predict", response_class=HTMLResponse)
-async def credit_predict(amount: float = Form(...),
-                         v1: float = Form(...),
-                         v2: float = Form(...)):
-
-    features = np.array([[amount, v1, v2]])
-    fraud_prob = model.predict_proba(features)[0][1]
-    percentage = int(fraud_prob * 100)
-
-    small_tx_count = len(credit_data[credit_data["Amount"] < 50])
-
-    if amount < 50 and small_tx_count > 100:
-        result = "🧨 SALAMI SLICING FRAUD DETECTED"
-    elif fraud_prob > 0.75:
-        result = "🚨 HIGH RISK FRAUD"
-    elif fraud_prob > 0.5:
-        result = "⚠️ SUSPICIOUS TRANSACTION"
-    else:
-        result = "✅ LEGITIMATE TRANSACTION"
-
-    return HTMLResponse(f"""
-    {STYLE}
+CREDIT_RESULT = ResultTemplate(STYLE + """
     <div class="card">
         <h2>AI SCAN RESULT</h2>
         <h3>{result}</h3>
@@ -315,12 +478,272 @@ async def credit_predict(amount: float = Form(...),
     </div>
     """)
 
+
+@app.get("/credit", response_class=HTMLResponse)
+async def credit_page(request: Request):
+    return CREDIT_PAGE.response(request.headers)
+
+@app.post("/credit-predict", response_class=HTMLResponse)
+async def credit_predict(request: Request,
+                         amount: float = Form(...),
+                         v1: float = Form(...),
+                         v2: float = Form(...),
+                         account: str = Form(None, max_length=MAX_ACCOUNT_LENGTH)):
+
+    entered = time.perf_counter()
+    observe_parse(request, CREDIT_STAGES, entered)
+
+    require_ready()
+    fraud_prob, result = await score_credit(amount, v1, v2, CREDIT_STAGES,
+                                            (account or "").strip() or None)
+    percentage = int(fraud_prob * 100)
+
+    scored = time.perf_counter()
+    response = HTMLResponse(CREDIT_RESULT.render(result=result, percentage=percentage))
+    CREDIT_STAGES["render"].observe(time.perf_counter() - scored)
+    return response
+
+# ==========================
+# CREDIT BATCH API
+# ==========================
+MAX_BATCH_ROWS = 100_000
+
+CreditRow = Annotated[List[float], Field(min_length=3, max_length=3)]
+AccountId = Annotated[str, Field(max_length=MAX_ACCOUNT_LENGTH)]
+
+
+class CreditBatch(BaseModel):
+    # Each row is [amount, v1, v2]; accounts[i], if given, is row i's account,
+    # and a row's windows include the rows before it for the same account
+    rows: List[CreditRow] = Field(min_length=1, max_length=MAX_BATCH_ROWS)
+    accounts: Optional[List[Optional[AccountId]]] = None
+
+
+@app.post("/api/credit/score-batch")
+async def credit_score_batch(batch: CreditBatch):
+    require_ready()
+    try:
+        features = credit_matrix(batch.rows)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if batch.accounts is not None and len(batch.accounts) != len(batch.rows):
+        raise HTTPException(status_code=422, detail="accounts and rows differ in length")
+
+    # Features and recording are vectorised but still take a while on a
+    # full batch, so they run off the event loop; rows are recorded only
+    # once the batch has been scored
+    amounts, now = features[:, 0], time.time()
+    account_features = None
+    if batch.accounts is not None:
+        account_features = await asyncio.to_thread(
+            velocity.features_many, batch.accounts, amounts, now)
+    fraud_probs = await predict_fraud(features)
+    if batch.accounts is not None:
+        await asyncio.to_thread(velocity.record_many, batch.accounts, amounts, now)
+    labels = credit_labels(amounts, fraud_probs, rules["credit"], account_features)
+
+    return {
+        "count": len(fraud_probs),
+        "probabilities": fraud_probs.tolist(),
+        "labels": labels.tolist(),
+    }
+
+# ==========================
+# CREDIT STREAMING API
+# ==========================
+MAX_STREAM_CHUNK_ROWS = 50_000
+
+
+def label_credit_batch(amounts, fraud_probs):
+    return credit_labels(amounts, fraud_probs, rules["credit"])
+
+
+@app.post("/api/credit/score-stream")
+async def credit_score_stream(request: Request, format: str = None,
+                              chunk_rows: int = settings.STREAM_CHUNK_ROWS):
+    require_ready()
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except StreamFormatError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    scorer = StreamScorer(predict_fraud, label_credit_batch,
+                          chunk_rows=min(chunk_rows, MAX_STREAM_CHUNK_ROWS))
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return DuplexStreamingResponse(scorer.stream(request.stream(), fmt),
+                                   media_type=media_type)
+
+@app.get("/stats/batcher")
+async def batcher_stats():
+    return credit_batcher.stats()
+
+
+@app.get("/stats/cache")
+async def cache_stats():
+    return prediction_cache.stats()
+
+
+@app.get("/stats/executor")
+async def executor_stats():
+    return inference.stats()
+
+
+@app.get("/stats/insurance")
+async def insurance_stats_view():
+    require_ready()
+    return insurance_stats.stats()
+
+
+@app.get("/stats/model")
+async def model_status():
+    return models.status()
+
+
+def require_admin(request):
+    token = request.headers.get("x-admin-token", "")
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled")
+    if not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="bad admin token")
+
+
+@app.post("/admin/model/reload")
+async def reload_model(request: Request, force: bool = False):
+    require_admin(request)
+    require_ready()
+    try:
+        return await models.reload(force=force, reason="admin")
+    except Exception as exc:
+        return JSONResponse({"reloaded": False, "error": repr(exc),
+                             "current": models.current.as_dict()}, status_code=422)
+
+
+@app.get("/stats/shadow")
+async def shadow_stats():
+    if shadow is None:
+        return {"enabled": False}
+    return {"enabled": True, **shadow.stats()}
+
+
+@app.post("/admin/shadow")
+async def start_shadow(request: Request, model: str,
+                       sample_rate: float = settings.SHADOW_SAMPLE_RATE):
+    require_admin(request)
+    require_ready()
+    if not 0.0 < sample_rate <= 1.0:
+        raise HTTPException(status_code=422, detail="sample_rate must be in (0, 1]")
+    try:
+        loaded = await asyncio.to_thread(load_shadow_model, model)
+    except Exception as exc:
+        return JSONResponse({"enabled": shadow is not None, "error": repr(exc)},
+                            status_code=422)
+    install_shadow(loaded, sample_rate)
+    return {"enabled": True, **shadow.stats()}
+
+
+@app.delete("/admin/shadow")
+async def stop_shadow(request: Request):
+    require_admin(request)
+    install_shadow(None, 0.0)
+    return {"enabled": False}
+
+
+@app.get("/stats/rules")
+async def rules_stats():
+    return rules.stats()
+
+
+@app.get("/stats/velocity")
+async def velocity_stats():
+    return velocity.stats()
+
+
+def cache_events():
+    stats = prediction_cache.stats()
+    return [((event,), stats[event])
+            for event in ("hits", "misses", "evictions", "expirations", "invalidations")]
+
+
+registry.counter_fn("greylock_prediction_cache_events_total",
+                    "Prediction cache lookups and removals by event.",
+                    cache_events, labelnames=["event"])
+registry.gauge_fn("greylock_prediction_cache_entries", "Entries in the prediction cache.",
+                  lambda: prediction_cache.stats()["size"])
+registry.gauge_fn("greylock_executor_in_flight", "Model calls submitted and not yet finished.",
+                  lambda: inference.stats()["in_flight"])
+registry.counter_fn("greylock_rule_hits_total", "Rows labelled by each decision rule.",
+                    lambda: [((name, rule), hits)
+                             for name, rs in rules.rulesets.items()
+                             for rule, hits in zip(rs.names, rs.hits.tolist())],
+                    labelnames=["ruleset", "rule"])
+registry.counter_fn("greylock_rule_evaluation_seconds_total",
+                    "Time spent evaluating each rule set.",
+                    lambda: [((name,), rs.seconds) for name, rs in rules.rulesets.items()],
+                    labelnames=["ruleset"])
+registry.counter_fn("greylock_model_reloads_total", "Model reload attempts by outcome.",
+                    lambda: [(("ok",), models.reloads), (("failed",), models.failures)],
+                    labelnames=["result"])
+registry.counter_fn("greylock_shadow_rows_total", "Rows re-scored by the shadow model.",
+                    lambda: [] if shadow is None else shadow.rows)
+registry.counter_fn("greylock_shadow_dropped_total",
+                    "Shadow samples dropped because its executor was full.",
+                    lambda: [] if shadow is None else shadow.dropped)
+registry.gauge_fn("greylock_shadow_agreement_ratio",
+                  "Share of shadowed rows on the same side of the threshold.",
+                  lambda: [] if shadow is None or not shadow.rows
+                  else shadow.agreed_rows / shadow.rows)
+registry.gauge_fn("greylock_velocity_accounts", "Accounts with velocity windows in memory.",
+                  lambda: velocity.stats()["accounts"])
+registry.counter_fn("greylock_velocity_removed_total",
+                    "Accounts removed from the velocity store: idle, evicted from a full "
+                    "set, or not recorded because the set was full.",
+                    lambda: [((reason,), velocity.stats()[key]) for reason, key in
+                             (("idle", "expirations"), ("full", "evictions"),
+                              ("dropped", "dropped"))],
+                    labelnames=["reason"])
+registry.counter_fn("greylock_velocity_skipped_rows_total",
+                    "Rows given no history, or not recorded, because the velocity lock "
+                    "timed out.",
+                    lambda: [((op,), velocity.stats()[key]) for op, key in
+                             (("features", "skipped_features"), ("record", "skipped_records"))],
+                    labelnames=["op"])
+registry.gauge_fn("greylock_ready", "1 once the model is loaded and warmed up.",
+                  lambda: 1 if readiness["state"] == "ready" else 0)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy(request, exc):
+    return PlainTextResponse("Scoring capacity exhausted, retry shortly",
+                             status_code=503, headers={"Retry-After": "1"})
+
+@app.exception_handler(ServiceNotReady)
+async def service_not_ready(request, exc):
+    return PlainTextResponse(f"Service is {exc}, retry shortly",
+                             status_code=503, headers={"Retry-After": "2"})
+
+# ==========================
+# HEALTH
+# ==========================
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    status_code = 200 if readiness["state"] == "ready" else 503
+    return JSONResponse(readiness, status_code=status_code)
+
 # ==========================
 # INSURANCE PAGE
 # ==========================
-@app.get("/insurance", response_class=HTMLResponse)
-async def insurance_page():
-    return HTMLResponse(f"""
+INSURANCE_PAGE = PrerenderedPage(f"""
     {STYLE}
     <div class="card">
         <h2>Insurance Fraud Detection</h2>
@@ -333,22 +756,126 @@ async def insurance_page():
     </div>
     """)
 
+INSURANCE_RESULT = ResultTemplate(STYLE + """
+    <div class="card">
+        <h2>AI SCAN RESULT</h2>
+        <h3>{result}</h3>
+        <a href="/insurance" class="button">Back</a>
+    </div>
+    """)
+
+
+@app.get("/insurance", response_class=HTMLResponse)
+async def insurance_page(request: Request):
+    return INSURANCE_PAGE.response(request.headers)
+
+def insurance_context(claims, numclaims):
+    # One stats snapshot per call, so a batch never straddles a refresh
+    return {"claim": claims, "numclaims": numclaims,
+            **insurance_stats.current.rule_fields()}
+
+
+def score_insurance(claim, numclaims):
+    # -> (flagged, label); shared by the form route and the JSON API
+    ruleset = rules["insurance"]
+    labels, choice = ruleset.evaluate(insurance_context(claim, numclaims))
+    return not ruleset.is_default(choice[0]), str(labels[0])
+
+
 @app.post("/insurance-predict", response_class=HTMLResponse)
 async def insurance_predict(claim: float = Form(...),
                             numclaims: int = Form(...)):
+    require_ready()
 
-    avg_claim = insurance_data["total_claim_amount"].mean()
+    _, result = score_insurance(claim, numclaims)
 
-    if claim > avg_claim * 2 and numclaims > 3:
-        result = "🚨 INSURANCE FRAUD DETECTED"
-    else:
-        result = "✅ CLAIM NORMAL"
+    return HTMLResponse(INSURANCE_RESULT.render(result=result))
 
-    return HTMLResponse(f"""
-    {STYLE}
-    <div class="card">
-        <h2>AI SCAN RESULT</h2>
-        <h3>{result}</h3>
-        <a href="/insurance" class="button">Back</a>
-    </div>
-    """)
\ No newline at end of file
+# ==========================
+# JSON SCORING API (v1)
+# ==========================
+# Same scoring core as the form routes, without multipart parsing or HTML.
+# Handlers return FastJSONResponse directly; the response models document
+# the schema but are not re-validated per request.
+class CreditScoreRequest(BaseModel):
+    amount: float
+    v1: float
+    v2: float
+    account: Optional[AccountId] = None
+
+
+class CreditScoreResponse(BaseModel):
+    fraud_probability: float
+    label: str
+    model_version: str
+
+
+class InsuranceScoreRequest(BaseModel):
+    claim: float
+    numclaims: int
+
+
+class InsuranceScoreResponse(BaseModel):
+    flagged: bool
+    label: str
+
+
+@app.post("/api/v1/credit/score", response_model=CreditScoreResponse)
+async def credit_score_v1(request: Request, body: CreditScoreRequest):
+    entered = time.perf_counter()
+    observe_parse(request, CREDIT_API_STAGES, entered)
+
+    require_ready()
+    fraud_prob, label = await score_credit(body.amount, body.v1, body.v2, CREDIT_API_STAGES,
+                                           body.account)
+
+    scored = time.perf_counter()
+    response = FastJSONResponse({
+        "fraud_probability": fraud_prob,
+        "label": label,
+        "model_version": models.current.version,
+    })
+    CREDIT_API_STAGES["render"].observe(time.perf_counter() - scored)
+    return response
+
+
+@app.post("/api/v1/insurance/score", response_model=InsuranceScoreResponse)
+async def insurance_score_v1(body: InsuranceScoreRequest):
+    require_ready()
+    flagged, label = score_insurance(body.claim, body.numclaims)
+    return FastJSONResponse({"flagged": flagged, "label": label})
+
+
+MAX_INSURANCE_BATCH = 500_000
+
+
+class InsuranceBatch(BaseModel):
+    # Columnar: claims[i] and numclaims[i] describe claim i
+    claims: List[float] = Field(min_length=1, max_length=MAX_INSURANCE_BATCH)
+    numclaims: List[int] = Field(min_length=1, max_length=MAX_INSURANCE_BATCH)
+
+
+@app.post("/api/v1/insurance/score-batch")
+async def insurance_score_batch(batch: InsuranceBatch):
+    require_ready()
+    if len(batch.claims) != len(batch.numclaims):
+        raise HTTPException(status_code=422, detail="claims and numclaims differ in length")
+
+    ruleset = rules["insurance"]
+    ctx = insurance_context(np.asarray(batch.claims, dtype=np.float64),
+                            np.asarray(batch.numclaims, dtype=np.int64))
+    _, choice = ruleset.evaluate(ctx)
+
+    # Index into small lists of shared str objects rather than building
+    # one numpy string per claim
+    labels = [r.label for r in ruleset.rules] + [ruleset.default]
+    names = [r.name for r in ruleset.rules] + [None]
+    choice = choice.tolist()
+    return FastJSONResponse({
+        "count": len(choice),
+        "flagged": sum(1 for c in choice if c != len(ruleset.rules)),
+        "labels": [labels[c] for c in choice],
+        "rules": [names[c] for c in choice],
+        "thresholds": ruleset.thresholds(ctx),
+        "stats_source": insurance_stats.current.source,
+    })
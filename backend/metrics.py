@@ -0,0 +1,247 @@
+import bisect
+import os
+import resource
+import threading
+import time
+
+import numpy as np
+# ==========================
+# HISTOGRAMS
+# ==========================
+# Cumulative-bucket histograms (Prometheus style). observe() is a bisect
+# plus two additions under a lock, cheap enough for the request path.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def observe_many(self, values):
+        # One searchsorted + bincount for a whole array of samples
+        values = np.asarray(values, dtype=np.float64).ravel()
+        per_bucket = np.bincount(np.searchsorted(self.buckets, values, side="left"),
+                                 minlength=len(self.counts)).tolist()
+        total = float(values.sum())
+        with self._lock:
+            for i, n in enumerate(per_bucket):
+                self.counts[i] += n
+            self.sum += total
+            self.count += len(values)
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        cumulative = []
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            cumulative.append(("+Inf" if bound == float("inf") else bound, running))
+
+        return {
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+            "buckets": cumulative,
+        }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+
+# ==========================
+# PROMETHEUS REGISTRY
+# ==========================
+# Metric families keyed by label values. Children are created on first
+# use; callers on the hot path should keep a reference to the child
+# (family.labels(...)) rather than look it up per event.
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Family:
+    def __init__(self, kind, name, help, labelnames=(), factory=None):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.factory = factory
+        self.children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(values, self.factory())
+        return child
+
+    def attach(self, child, *values):
+        # Expose an existing Histogram/Counter (e.g. the batcher's) here
+        self.children[values] = child
+        return child
+
+    def clear(self):
+        self.children = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self.children.items()):
+            if self.kind == "histogram":
+                snap = child.snapshot()
+                for bound, count in snap["buckets"]:
+                    le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(float(bound))}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [le])} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(snap['sum'])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {snap['count']}")
+            else:
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}")
+        return lines
+
+
+class CallbackFamily:
+    # Gauge or counter read at scrape time: fn() -> number, or a list of
+    # (label values tuple, number)
+    def __init__(self, kind, name, help, fn, labelnames=()):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        value = self.fn()
+        samples = value if isinstance(value, list) else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, v in samples:
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(v)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+
+    def _add(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Family("counter", name, help, labelnames, Counter))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._add(Family("histogram", name, help, labelnames,
+                                lambda: Histogram(buckets)))
+
+    def gauge_fn(self, name, help, fn, labelnames=()):
+        return self._add(CallbackFamily("gauge", name, help, fn, labelnames))
+
+    def counter_fn(self, name, help, fn, labelnames=()):
+        return self._add(CallbackFamily("counter", name, help, fn, labelnames))
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# ==========================
+# PROCESS METRICS
+# ==========================
+PROCESS_START = time.time()
+
+
+def _statm():
+    try:
+        with open("/proc/self/statm") as f:
+            size, resident = f.read().split()[:2]
+        page = os.sysconf("SC_PAGE_SIZE")
+        return int(size) * page, int(resident) * page
+    except (OSError, ValueError):
+        return 0, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def register_process_metrics(registry):
+    registry.gauge_fn("process_resident_memory_bytes", "Resident memory size in bytes.",
+                      lambda: _statm()[1])
+    registry.gauge_fn("process_virtual_memory_bytes", "Virtual memory size in bytes.",
+                      lambda: _statm()[0])
+    registry.counter_fn("process_cpu_seconds_total", "User and system CPU time in seconds.",
+                        lambda: sum(resource.getrusage(resource.RUSAGE_SELF)[:2]))
+    registry.gauge_fn("process_start_time_seconds", "Start time of the process (unix epoch).",
+                      lambda: PROCESS_START)
+
+
+# ==========================
+# HTTP MIDDLEWARE
+# ==========================
+class RequestMetricsMiddleware:
+    # Plain ASGI middleware (no per-request task or body copying). Routes
+    # are labelled by their path template; anything unrouted is lumped
+    # into "unmatched" so scanners cannot blow up label cardinality.
+    def __init__(self, app, requests, latency):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        scope.setdefault("state", {})["metrics_started"] = started
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            self.latency.labels(path, method).observe(time.perf_counter() - started)
+            self.requests.labels(path, method, str(status)).inc()
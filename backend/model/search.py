@@ -0,0 +1,193 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Allow `python backend/model/search.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.executor import available_cores
+from backend.forest import CompiledForest
+from backend.model.train_model import (
+    CACHE_ROOT,
+    DATA_PATH,
+    DEFAULT_FOREST,
+    evaluate,
+    prepare_split,
+    print_report,
+)
+
+# ==========================
+# HYPERPARAMETER SEARCH
+# ==========================
+# python backend/model/search.py [--grid n_estimators=50,100 max_depth=8,None]
+#                                [--sample 20] [--workers N]
+#
+# The train/test split comes from the training pipeline's cache (built
+# once if missing). Workers memory-map the same .npy files, so N
+# candidates fitting at once share one copy of the data. Each candidate is
+# fitted single-threaded and reports accuracy metrics, compiled-forest
+# latency and model size. The report ranks candidates that keep recall
+# within --recall-tolerance of the best by single-row latency.
+
+DEFAULT_GRID = {
+    "n_estimators": [25, 50, 100, 200],
+    "max_depth": [8, 12, 16, None],
+    "min_samples_leaf": [1, 5, 20],
+    "class_weight": [None, "balanced"],
+}
+
+
+def parse_value(raw):
+    if raw == "None":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    return raw
+
+
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise SystemExit(f"bad grid entry {spec!r}, expected name=v1,v2,...")
+        grid[name] = [parse_value(v) for v in values.split(",")]
+    return grid
+
+
+def candidates(grid, sample=None, seed=0):
+    names = sorted(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if sample and sample < len(combos):
+        combos = random.Random(seed).sample(combos, sample)
+    return [dict(DEFAULT_FOREST, **combo) for combo in combos]
+
+
+def _best_time(fn, X, repeat):
+    fn(X)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(X)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def evaluate_candidate(split_dir, params):
+    X_train, X_test, y_train, y_test = (
+        np.load(os.path.join(split_dir, f"{name}.npy"), mmap_mode="r")
+        for name in ("X_train", "X_test", "y_train", "y_test"))
+
+    started = time.perf_counter()
+    model = RandomForestClassifier(**params, n_jobs=1)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    metrics = evaluate(model, X_test, y_test)
+    compiled = CompiledForest.from_sklearn(model)
+
+    rows = np.asarray(X_test[:64], dtype=np.float64)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, "candidate.forest")
+        compiled.save(artifact)
+        artifact_bytes = os.path.getsize(artifact)
+
+    return {
+        "params": params,
+        "metrics": metrics,
+        "fit_seconds": fit_seconds,
+        "latency_single_row_us": _best_time(compiled.fraud_proba, rows[:1], 50) * 1e6,
+        "latency_batch64_per_row_us": _best_time(compiled.fraud_proba, rows, 20) * 1e6 / len(rows),
+        "nodes": compiled.n_nodes,
+        "max_depth": compiled.max_depth,
+        "artifact_bytes": artifact_bytes,
+        "pickle_bytes": len(pickle.dumps(model)),
+    }
+
+
+def rank(results, recall_tolerance):
+    best_recall = max(r["metrics"]["recall"] for r in results)
+    floor = best_recall - recall_tolerance
+    for r in results:
+        r["keeps_recall"] = r["metrics"]["recall"] >= floor
+
+    # Recall-keeping candidates fastest first, then the rest by recall
+    return sorted(results, key=lambda r: (
+        not r["keeps_recall"],
+        r["latency_single_row_us"] if r["keeps_recall"] else -r["metrics"]["recall"],
+    ))
+
+
+def print_ranking(ranked):
+    print(f"{'#':>3} {'trees':>5} {'depth':>5} {'leaf':>4} {'weight':>8} "
+          f"{'recall':>7} {'prec':>6} {'f1':>6} {'1-row us':>9} {'us/row@64':>9} "
+          f"{'nodes':>8} {'KB':>7}")
+    for i, r in enumerate(ranked, 1):
+        p, m = r["params"], r["metrics"]
+        print(f"{i:>3} {p['n_estimators']:>5} {str(p['max_depth']):>5} "
+              f"{p['min_samples_leaf']:>4} {str(p['class_weight']):>8} "
+              f"{m['recall']:7.4f} {m['precision']:6.3f} {m['f1']:6.3f} "
+              f"{r['latency_single_row_us']:9.1f} {r['latency_batch64_per_row_us']:9.2f} "
+              f"{r['nodes']:>8} {r['artifact_bytes'] / 1024:7.1f}"
+              f"{'' if r['keeps_recall'] else '  (recall below floor)'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search RandomForest configurations.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--grid", nargs="*", default=[],
+                        help="name=v1,v2,... entries replacing the default grid")
+    parser.add_argument("--sample", type=int, default=0,
+                        help="evaluate a random sample of this many grid points")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="default: all cores")
+    parser.add_argument("--recall-tolerance", type=float, default=0.01)
+    parser.add_argument("--output", help="report path (default: .cache/search/<time>.json)")
+    args = parser.parse_args(argv)
+
+    grid = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    todo = candidates(grid, args.sample, args.seed)
+
+    report = []
+    split_key, _ = prepare_split(report, args.data)
+    print_report(report)
+    split_dir = os.path.join(CACHE_ROOT, "split", split_key)
+
+    workers = args.workers or available_cores()
+    print(f"evaluating {len(todo)} candidates on {workers} workers")
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_candidate, split_dir, params) for params in todo]
+        for done in as_completed(futures):
+            results.append(done.result())
+            print(f"\r{len(results)}/{len(todo)} done", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+
+    ranked = rank(results, args.recall_tolerance)
+    print_ranking(ranked)
+
+    output = args.output or os.path.join(
+        os.path.dirname(CACHE_ROOT), "search", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"split_key": split_key, "grid": grid,
+                   "recall_tolerance": args.recall_tolerance, "ranked": ranked},
+                  f, indent=1, default=str)
+    print(f"report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
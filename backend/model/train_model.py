@@ -1,25 +1,332 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import (
+    accuracy_score,
+    confusion_matrix,
+    f1_score,
+    precision_score,
+    recall_score,
+    roc_auc_score,
+)
 from sklearn.model_selection import train_test_split
 import joblib
 
-# Load dataset (must contain: Amount, V1, V2, Class)
-data = pd.read_csv("backend/model/creditcard.csv")
+# Allow `python backend/model/train_model.py` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-# Select features
-X = data[["Amount", "V1", "V2"]]
-y = data["Class"]
+from backend.dataset_cache import file_sha256, load_csv
+from backend.forest import ARTIFACT_SUFFIX, CompiledForest, verify_parity
 
-# Split dataset
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+# ==========================
+# TRAINING PIPELINE
+# ==========================
+# load -> split -> fit -> evaluate -> export
+#
+# Every stage but export writes its outputs under .cache/train/<stage>/<key>
+# where the key hashes the stage's parameters and its upstream key. A
+# stage whose key already has outputs is skipped, so changing only the
+# forest's hyperparameters re-runs fit/evaluate/export but reuses the
+# loaded and split data (stored as .npy and memory-mapped back).
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(MODEL_DIR, "creditcard.csv")
+MODEL_PATH = os.path.join(MODEL_DIR, "fraud_model.pkl")
+ARTIFACT_PATH = os.path.join(MODEL_DIR, "fraud_model" + ARTIFACT_SUFFIX)
+META_PATH = os.path.join(MODEL_DIR, "fraud_model.json")
+CACHE_ROOT = os.path.join(MODEL_DIR, ".cache", "train")
+
+# Dataset must contain: Amount, V1, V2, Class
+FEATURES = ["Amount", "V1", "V2"]
+TARGET = "Class"
+
+DEFAULT_FOREST = {
+    "n_estimators": 100,
+    "max_depth": None,
+    "min_samples_leaf": 1,
+    "max_features": "sqrt",
+    "class_weight": None,
+    "random_state": 42,
+}
+
+
+# ==========================
+# STAGE BOOKKEEPING
+# ==========================
+class PeakRSS:
+    # Samples this process's resident set in a background thread; the
+    # forest fit allocates in C, which tracemalloc would not see.
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start = self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def stage_key(name, params):
+    raw = json.dumps([name, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def run_stage(report, name, params, build, load, force=False, cache_root=CACHE_ROOT):
+    key = stage_key(name, params)
+    path = os.path.join(cache_root, name, key)
+    started = time.perf_counter()
+
+    with PeakRSS() as rss:
+        if not force and os.path.exists(os.path.join(path, "DONE")):
+            result = load(path)
+            status = "cached"
+        else:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            build(tmp)
+            open(os.path.join(tmp, "DONE"), "w").close()
+            shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp, path)
+            result = load(path)
+            status = "ran"
+
+    report.append({
+        "stage": name,
+        "status": status,
+        "key": key,
+        "seconds": time.perf_counter() - started,
+        "peak_rss_bytes": rss.peak,
+        "peak_rss_growth_bytes": rss.peak - rss.start,
+    })
+    return key, result
+
+
+def _load_arrays(names):
+    def load(path):
+        return tuple(np.load(os.path.join(path, f"{n}.npy"), mmap_mode="r") for n in names)
+    return load
+
+
+# ==========================
+# STAGES
+# ==========================
+def load_stage(report, data_path=DATA_PATH, force=False):
+    st = os.stat(data_path)
+    params = {"data": os.path.abspath(data_path), "size": st.st_size,
+              "mtime_ns": st.st_mtime_ns, "features": FEATURES, "target": TARGET}
+
+    def build(path):
+        data = load_csv(data_path, columns=FEATURES + [TARGET])
+        # Trees train on float32 internally, so this loses nothing
+        np.save(os.path.join(path, "X.npy"), data[FEATURES].to_numpy(dtype=np.float32))
+        np.save(os.path.join(path, "y.npy"), data[TARGET].to_numpy(dtype=np.int8))
+
+    return run_stage(report, "load", params, build, _load_arrays(["X", "y"]), force)
+
+
+def split_stage(report, load_key, X, y, test_size=0.2, random_state=42, force=False):
+    params = {"load": load_key, "test_size": test_size, "random_state": random_state}
+    names = ["X_train", "X_test", "y_train", "y_test"]
+
+    def build(path):
+        parts = train_test_split(X, y, test_size=test_size, random_state=random_state)
+        for name, part in zip(names, parts):
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(part))
+
+    return run_stage(report, "split", params, build, _load_arrays(names), force)
+
+
+def fit_stage(report, split_key, X_train, y_train, forest_params, n_jobs=-1, force=False):
+    params = {"split": split_key, "forest": forest_params}
+
+    def build(path):
+        model = RandomForestClassifier(**forest_params, n_jobs=n_jobs)
+        model.fit(X_train, y_train)
+        # Serving scores one small batch at a time; per-call joblib
+        # dispatch across cores would only add latency there
+        model.n_jobs = None
+        joblib.dump(model, os.path.join(path, "model.pkl"))
+
+    def load(path):
+        return joblib.load(os.path.join(path, "model.pkl"))
+
+    return run_stage(report, "fit", params, build, load, force)
+
+
+def evaluate(model, X_test, y_test):
+    fraud_probs = model.predict_proba(X_test)[:, 1]
+    predicted = (fraud_probs > 0.5).astype(np.int8)
+    metrics = {
+        "accuracy": accuracy_score(y_test, predicted),
+        "precision": precision_score(y_test, predicted, zero_division=0),
+        "recall": recall_score(y_test, predicted, zero_division=0),
+        "f1": f1_score(y_test, predicted, zero_division=0),
+        "confusion_matrix": confusion_matrix(y_test, predicted, labels=[0, 1]).tolist(),
+        "test_rows": int(len(y_test)),
+    }
+    if len(np.unique(y_test)) == 2:
+        metrics["roc_auc"] = roc_auc_score(y_test, fraud_probs)
+    return metrics
+
+
+def evaluate_stage(report, fit_key, model, X_test, y_test, force=False):
+    def build(path):
+        with open(os.path.join(path, "metrics.json"), "w") as f:
+            json.dump(evaluate(model, X_test, y_test), f, indent=1)
+
+    def load(path):
+        with open(os.path.join(path, "metrics.json")) as f:
+            return json.load(f)
+
+    return run_stage(report, "evaluate", {"fit": fit_key}, build, load, force)
+
+
+def export_model(model, X_test, fit_key):
+    # Both files are staged next to their final names and renamed into
+    # place only after the artifact passed the parity check, pickle first
+    # so the artifact ends up the newer of the two. A running server maps
+    # the old artifact and must never see a half-written or unverified one.
+    pickle_tmp = f"{MODEL_PATH}.{os.getpid()}.tmp"
+    artifact_tmp = f"{ARTIFACT_PATH}.{os.getpid()}.new"
+    try:
+        joblib.dump(model, pickle_tmp)
+        CompiledForest.from_sklearn(model).save(artifact_tmp, metadata={
+            "n_estimators": model.n_estimators,
+            "features": FEATURES,
+            "fit_key": fit_key,
+            # Lets the server use this pickle as the artifact's sklearn
+            # fallback for large batches
+            "pickle_sha256": file_sha256(pickle_tmp),
+        })
+        check_rows = np.asarray(X_test[:5000], dtype=np.float64)
+        verify_parity(CompiledForest.load(artifact_tmp, use_mmap=False), model, check_rows,
+                      atol=1e-6)
+        os.replace(pickle_tmp, MODEL_PATH)
+        os.replace(artifact_tmp, ARTIFACT_PATH)
+    finally:
+        for tmp in (pickle_tmp, artifact_tmp):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def export_stage(report, fit_key, model, X_test, forest_params, metrics, force=False):
+    started = time.perf_counter()
+    status = "cached"
+
+    with PeakRSS() as rss:
+        try:
+            with open(META_PATH) as f:
+                current = json.load(f).get("fit_key")
+        except (OSError, ValueError):
+            current = None
+
+        fresh = current == fit_key and os.path.exists(MODEL_PATH) and os.path.exists(ARTIFACT_PATH)
+        if force or not fresh:
+            export_model(model, X_test, fit_key)
+            with open(META_PATH, "w") as f:
+                json.dump({"fit_key": fit_key, "forest": forest_params,
+                           "features": FEATURES, "metrics": metrics}, f, indent=1)
+            status = "ran"
+
+    report.append({
+        "stage": "export",
+        "status": status,
+        "key": fit_key,
+        "seconds": time.perf_counter() - started,
+        "peak_rss_bytes": rss.peak,
+        "peak_rss_growth_bytes": rss.peak - rss.start,
+    })
+
+
+# ==========================
+# DRIVER
+# ==========================
+def prepare_split(report, data_path=DATA_PATH, test_size=0.2, random_state=42, force=False):
+    load_key, (X, y) = load_stage(report, data_path, force)
+    return split_stage(report, load_key, X, y, test_size, random_state, force)
+
+
+def print_report(report):
+    print(f"{'stage':<10} {'status':<7} {'seconds':>9} {'peak RSS MB':>12} "
+          f"{'growth MB':>10}  key")
+    for row in report:
+        print(f"{row['stage']:<10} {row['status']:<7} {row['seconds']:9.2f} "
+              f"{row['peak_rss_bytes'] / 1e6:12.1f} "
+              f"{row['peak_rss_growth_bytes'] / 1e6:10.1f}  {row['key']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train and export the credit fraud forest.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--n-estimators", type=int, default=DEFAULT_FOREST["n_estimators"])
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_FOREST["max_depth"])
+    parser.add_argument("--min-samples-leaf", type=int, default=DEFAULT_FOREST["min_samples_leaf"])
+    parser.add_argument("--class-weight", choices=["balanced", "balanced_subsample"],
+                        default=DEFAULT_FOREST["class_weight"])
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="cores used to fit the forest (-1: all)")
+    parser.add_argument("--force", action="store_true", help="ignore cached stages")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    forest_params = dict(DEFAULT_FOREST,
+                         n_estimators=args.n_estimators,
+                         max_depth=args.max_depth,
+                         min_samples_leaf=args.min_samples_leaf,
+                         class_weight=args.class_weight,
+                         random_state=args.random_state)
+    report = []
+
+    split_key, (X_train, X_test, y_train, y_test) = prepare_split(
+        report, args.data, args.test_size, args.random_state, args.force)
+    fit_key, model = fit_stage(report, split_key, X_train, y_train, forest_params,
+                               args.n_jobs, args.force)
+    _, metrics = evaluate_stage(report, fit_key, model, X_test, y_test, args.force)
+    export_stage(report, fit_key, model, X_test, forest_params, metrics, args.force)
+
+    print_report(report)
+    print(f"precision {metrics['precision']:.4f}  recall {metrics['recall']:.4f}  "
+          f"f1 {metrics['f1']:.4f}")
+    os.makedirs(CACHE_ROOT, exist_ok=True)
+    with open(os.path.join(CACHE_ROOT, "last_run.json"), "w") as f:
+        json.dump({"report": report, "metrics": metrics}, f, indent=1)
 
-# Train model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    print("✅ Model trained and saved successfully.")
 
-# Save model
-joblib.dump(model, "backend/model/fraud_model.pkl")
 
-print("✅ Model trained and saved successfully.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import joblib
+import numpy as np
+
+from backend.dataset_cache import file_sha256
+from backend.forest import (
+    ARTIFACT_SUFFIX,
+    CompiledForest,
+    pickle_path_for,
+    preferred_model_path,
+    verify_parity,
+)
+from backend.scoring import fraud_probabilities
+
+# ==========================
+# MODEL MANAGER
+# ==========================
+# Owns the scoring model and replaces it without a restart:
+#
+#   load (worker thread) -> validate -> prepare (async, e.g. warm a new
+#   process pool) -> commit (synchronous swap)
+#
+# Callers read manager.current once per prediction, so a call that already
+# started finishes on the model it picked up. Nothing after validation can
+# leave a half-swapped state: commit runs without yielding to the loop.
+# A candidate that fails to load or validate is dropped and the current
+# model keeps serving. New files must be put in place by rename, as
+# train_model.py does: a .forest is memory-mapped, and overwriting it in
+# place would fault every process still mapping the old contents.
+
+logger = logging.getLogger("greylock")
+
+
+class ModelRejected(Exception):
+    pass
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class LoadedModel:
+    def __init__(self, model, path, fingerprint, checksum, load_seconds):
+        self.model = model
+        self.path = path
+        self.fingerprint = fingerprint
+        self.checksum = checksum
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.version = f"{os.path.basename(path)}@{fingerprint[path][0]}"
+
+    def as_dict(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "sha256": self.checksum,
+            "evaluator": type(self.model).__name__,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+
+def prepare_pickle(raw_model, reference_rows, compile_forest=True, compiled_max_rows=None):
+    # Swap in the array-based evaluator only if it reproduces sklearn
+    if not compile_forest:
+        return raw_model
+    try:
+        compiled = CompiledForest.from_sklearn(raw_model, max_rows=compiled_max_rows)
+        verify_parity(compiled, raw_model, reference_rows)
+    except Exception:
+        logger.exception("compiled forest rejected, scoring with sklearn")
+        return raw_model
+    return compiled
+
+
+def validate_model(model, rows):
+    try:
+        probs = np.asarray(fraud_probabilities(model, rows), dtype=np.float64)
+    except Exception as exc:
+        raise ModelRejected(f"candidate failed to score reference rows: {exc!r}") from exc
+    if probs.shape != (len(rows),):
+        raise ModelRejected(f"candidate returned shape {probs.shape} for {len(rows)} rows")
+    if not np.all(np.isfinite(probs)) or probs.min() < 0 or probs.max() > 1:
+        raise ModelRejected("candidate returned probabilities outside [0, 1]")
+
+
+def load_model(path, reference_rows, compile_forest=True, compiled_max_rows=None,
+               fingerprint=None):
+    # .forest or .pkl -> validated LoadedModel (blocking)
+    started = time.perf_counter()
+    fingerprint = fingerprint or {path: _stat(path)}
+    if path.endswith(ARTIFACT_SUFFIX):
+        # Parity was checked when train_model.py exported it
+        model = CompiledForest.load(path, max_rows=compiled_max_rows,
+                                    fallback_path=pickle_path_for(path))
+    else:
+        model = prepare_pickle(joblib.load(path), reference_rows, compile_forest,
+                               compiled_max_rows)
+    validate_model(model, reference_rows)
+    return LoadedModel(model, path, fingerprint, file_sha256(path),
+                       time.perf_counter() - started)
+
+
+class ModelManager:
+    def __init__(self, pickle_path, artifact_path, use_artifact=True, compile_forest=True,
+                 compiled_max_rows=None, prepare=None, commit=None):
+        self.pickle_path = pickle_path
+        self.artifact_path = artifact_path
+        self.use_artifact = use_artifact
+        self.compile_forest = compile_forest
+        self.compiled_max_rows = compiled_max_rows
+
+        # prepare(candidate) -> token (async), commit(candidate, token)
+        self.prepare = prepare
+        self.commit = commit
+
+        # Rows every candidate must score sanely (set after the dataset loads)
+        self.reference_rows = None
+
+        self.current = None
+        self.history = deque(maxlen=10)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_seconds = None
+        self._lock = asyncio.Lock()
+        self._seen = None
+
+    def model_path(self):
+        # The artifact is a compiled forest, so it is skipped along with it
+        if not self.use_artifact or not self.compile_forest:
+            return self.pickle_path
+        return preferred_model_path(self.pickle_path, self.artifact_path)
+
+    def fingerprint(self):
+        return {path: _stat(path) for path in (self.pickle_path, self.artifact_path)}
+
+    def load(self):
+        # Blocking: run in a worker thread for reloads
+        fingerprint = self.fingerprint()
+        path = self.model_path()
+        if fingerprint.get(path) is None:
+            raise ModelRejected(f"{path} does not exist")
+        return load_model(path, self.reference_rows, self.compile_forest,
+                          self.compiled_max_rows, fingerprint)
+
+    def load_initial(self):
+        loaded = self.load()
+        self._activate(loaded, None)
+        return loaded
+
+    def _activate(self, loaded, token):
+        previous = self.current
+        if self.commit is not None:
+            self.commit(loaded, token)
+        self.current = loaded
+        self._seen = loaded.fingerprint
+        if previous is not None:
+            self.history.appendleft(previous.as_dict())
+
+    async def reload(self, force=False, reason="admin"):
+        async with self._lock:
+            if not force and self.current is not None \
+                    and self.fingerprint() == self.current.fingerprint:
+                return {"reloaded": False, "reason": "unchanged", **self.current.as_dict()}
+
+            started = time.perf_counter()
+            try:
+                candidate = await asyncio.to_thread(self.load)
+                token = await self.prepare(candidate) if self.prepare is not None else None
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = repr(exc)
+                # Do not retry the same broken files on every poll
+                self._seen = self.fingerprint()
+                logger.error("model reload (%s) failed, keeping %s: %r", reason,
+                             self.current.version if self.current else None, exc)
+                raise
+
+            self._activate(candidate, token)
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_seconds = time.perf_counter() - started
+            logger.info("model reloaded (%s): %s in %.2fs", reason, candidate.version,
+                        self.last_reload_seconds)
+            return {"reloaded": True, "reason": reason,
+                    "reload_seconds": self.last_reload_seconds, **candidate.as_dict()}
+
+    async def watch(self, interval):
+        # Acts on a change only once the files have stopped changing for one
+        # interval, so a model that is still being written is not picked up
+        pending = None
+        while True:
+            await asyncio.sleep(interval)
+            fingerprint = await asyncio.to_thread(self.fingerprint)
+            if fingerprint == self._seen:
+                pending = None
+                continue
+            if fingerprint != pending:
+                pending = fingerprint
+                continue
+            try:
+                await self.reload(reason="file change")
+            except Exception:
+                pass  # logged and counted by reload()
+            pending = None
+
+    def status(self):
+        return {
+            "current": self.current.as_dict() if self.current else None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_seconds": self.last_reload_seconds,
+            "previous": list(self.history),
+        }
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import html
+from string import Formatter
+
+from fastapi.responses import Response
+
+from backend.assets import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: gzip and identity still work
+    brotli = None
+
+# ==========================
+# PRE-RENDERED PAGES
+# ==========================
+# Static pages are rendered once into bytes, with gzip (and brotli when
+# installed) variants built at the same time. A request only picks a
+# variant from Accept-Encoding and compares ETags; nothing is formatted or
+# compressed per request.
+
+HTML_MEDIA_TYPE = "text/html; charset=utf-8"
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+def parse_accept_encoding(header):
+    # -> {coding: q}; missing header means identity only
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, available):
+    # available: codings in order of preference, e.g. ("br", "gzip")
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class PrerenderedPage:
+    def __init__(self, text):
+        self.body = text.encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:16]
+
+        # coding -> (bytes, etag); each representation gets its own ETag
+        self.variants = {None: (self.body, f'"{digest}"')}
+        self.variants["gzip"] = (gzip.compress(self.body, compresslevel=9, mtime=0),
+                                 f'"{digest}-gz"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(self.body, quality=11), f'"{digest}-br"')
+        self.encodings = tuple(c for c in ("br", "gzip") if c in self.variants)
+
+    def response(self, headers):
+        coding = negotiate(headers.get("accept-encoding"), self.encodings)
+        body, etag = self.variants[coding]
+
+        response_headers = {"ETag": etag, "Vary": "Accept-Encoding",
+                            "Cache-Control": PAGE_CACHE_CONTROL}
+        if etag_matches(headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=response_headers)
+        if coding is not None:
+            response_headers["Content-Encoding"] = coding
+        return Response(body, media_type=HTML_MEDIA_TYPE, headers=response_headers)
+
+
+# ==========================
+# RESULT TEMPLATES
+# ==========================
+class ResultTemplate:
+    # Splits "<h3>{result}</h3>"-style source once into encoded literal
+    # chunks and field names; render() only joins bytes.
+    def __init__(self, source):
+        self.parts = []
+        for literal, field, _, _ in Formatter().parse(source):
+            if literal:
+                self.parts.append(literal.encode("utf-8"))
+            if field is not None:
+                self.parts.append(field)
+
+    def render(self, **fields):
+        return b"".join(
+            part if isinstance(part, bytes)
+            else html.escape(str(fields[part]), quote=True).encode("utf-8")
+            for part in self.parts
+        )
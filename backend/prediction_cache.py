@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+
+# ==========================
+# PREDICTION CACHE
+# ==========================
+# LRU + TTL cache of fraud probabilities keyed by the feature tuple.
+# Optionally rounds inputs to `precision` decimals first, so near-identical
+# retries share an entry (the cached score is then the one computed for
+# the first row seen in that bucket). Entries are tied to a model version
+# and the whole cache is dropped when the version changes.
+#
+# Only touched from the event loop, so no locking.
+
+
+class PredictionCache:
+    def __init__(self, max_size=10000, ttl=300.0, precision=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.precision = precision
+        self.model_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def key(self, row):
+        if self.precision is None:
+            return tuple(float(x) for x in row)
+        return tuple(round(float(x), self.precision) for x in row)
+
+    def set_model_version(self, version):
+        if version != self.model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.model_version = version
+
+    def get(self, row):
+        key = self.key(row)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, row, value, model_version=None):
+        # model_version: the version current when scoring started. A value
+        # whose model was replaced while it was computed is not stored.
+        if model_version is not None and model_version != self.model_version:
+            return
+        key = self.key(row)
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "precision": self.precision,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
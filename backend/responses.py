@@ -0,0 +1,38 @@
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+# ==========================
+# FAST JSON RESPONSES
+# ==========================
+# Handlers return FastJSONResponse(dict) directly, which skips FastAPI's
+# jsonable_encoder/response-model round trip. orjson (when installed) also
+# serializes numpy scalars and arrays natively.
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content):
+        return orjson.dumps(content, option=_OPTIONS)
+else:
+    def _default(value):
+        # numpy scalars / arrays
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    def dumps(content):
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"),
+                          allow_nan=False, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+# ==========================
+# DECISION RULES
+# ==========================
+# Label rules live in a JSON file (backend/rules.json by default):
+#
+#   {"credit": {"default": "...", "rules": [
+#       {"name": "high_risk", "label": "...",
+#        "all": [{"field": "fraud_probability", "op": ">", "value": 0.75}]},
+#       {"name": "...", "label": "...",
+#        "any": [{"field": "claim", "op": ">", "ref": "avg_claim", "scale": 2}, ...]}]}}
+#
+# Each condition compares a field with a constant ("value") or with
+# another field times "scale" ("ref"). A rule matches when all of its "all"
+# conditions and at least one "any" condition hold. Rules are tried in
+# order and the first match wins, like np.select. Every rule set is
+# compiled once into closures over NumPy comparisons and evaluated over a
+# whole batch at a time.
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+
+# Names a rule may refer to, per rule set; scalars broadcast over the batch
+RULE_FIELDS = {
+    "credit": ("amount", "fraud_probability",
+               # per account, see velocity.FEATURES
+               "account_tx_1m", "account_amount_1m", "account_small_tx_1m",
+               "account_tx_1h", "account_amount_1h", "account_small_tx_1h",
+               "account_tx_24h", "account_amount_24h", "account_small_tx_24h"),
+    "insurance": ("claim", "numclaims", "avg_claim",
+                  "claim_p50", "claim_p90", "claim_p95", "claim_p99"),
+}
+
+OPS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+logger = logging.getLogger("greylock")
+
+
+class RuleError(ValueError):
+    pass
+
+
+def compile_condition(spec, fields):
+    try:
+        field, op = spec["field"], OPS[spec["op"]]
+    except KeyError as exc:
+        raise RuleError(f"condition {spec!r} needs a field and an op in {sorted(OPS)}") from exc
+    if field not in fields:
+        raise RuleError(f"unknown field {field!r}, expected one of {', '.join(fields)}")
+
+    if "value" in spec:
+        value = float(spec["value"])
+        return lambda ctx: op(ctx[field], value)
+
+    ref = spec.get("ref")
+    if ref not in fields:
+        raise RuleError(f"condition on {field!r} needs a value or a known ref")
+    scale = float(spec.get("scale", 1.0))
+    return lambda ctx: op(ctx[field], ctx[ref] * scale)
+
+
+class Rule:
+    def __init__(self, spec, fields):
+        self.name = spec.get("name")
+        self.label = spec.get("label")
+        if not self.name or not self.label:
+            raise RuleError(f"rule {spec!r} needs a name and a label")
+        self.all = [compile_condition(c, fields) for c in spec.get("all", [])]
+        self.any = [compile_condition(c, fields) for c in spec.get("any", [])]
+        if not self.all and not self.any:
+            raise RuleError(f"rule {self.name!r} has no conditions")
+        self.spec = spec
+
+    def mask(self, ctx):
+        mask = True
+        for condition in self.all:
+            mask = mask & condition(ctx)
+        if self.any:
+            hit = False
+            for condition in self.any:
+                hit = hit | condition(ctx)
+            mask = mask & hit
+        return mask
+
+
+class RuleSet:
+    def __init__(self, name, spec, fields):
+        self.name = name
+        self.rules = [Rule(r, fields) for r in spec.get("rules", [])]
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise RuleError(f"duplicate rule names in {name!r}")
+        self.default = spec.get("default")
+        if not self.default:
+            raise RuleError(f"rule set {name!r} needs a default label")
+
+        # Index len(rules) is "no rule matched"
+        self.labels = np.array([r.label for r in self.rules] + [self.default])
+        self.names = names + ["default"]
+        self.hits = np.zeros(len(self.names), dtype=np.int64)
+        self.evaluations = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def evaluate(self, ctx):
+        # ctx: field -> scalar or 1-d array; returns (labels, rule index)
+        started = time.perf_counter()
+        ctx = {k: np.asarray(v) for k, v in ctx.items()}
+        n = max((v.size for v in ctx.values() if v.ndim), default=1)
+
+        choice = np.full(n, len(self.rules), dtype=np.intp)
+        undecided = np.ones(n, dtype=bool)
+        for i, rule in enumerate(self.rules):
+            hit = np.broadcast_to(rule.mask(ctx), (n,)) & undecided
+            choice[hit] = i
+            undecided &= ~hit
+            if not undecided.any():
+                break
+
+        self.hits += np.bincount(choice, minlength=len(self.names))
+        self.evaluations += 1
+        self.rows += n
+        self.seconds += time.perf_counter() - started
+        return self.labels[choice], choice
+
+    def is_default(self, choice):
+        return choice == len(self.rules)
+
+    def thresholds(self, ctx):
+        # rule name -> its conditions with "ref" resolved against the
+        # scalar fields of ctx (a per-row ref stays symbolic)
+        out = {}
+        for rule in self.rules:
+            conditions = []
+            for group in ("all", "any"):
+                for spec in rule.spec.get(group, []):
+                    if "value" in spec:
+                        threshold = float(spec["value"])
+                    else:
+                        ref = np.asarray(ctx.get(spec["ref"]))
+                        scale = float(spec.get("scale", 1.0))
+                        threshold = (float(ref) * scale if ref.ndim == 0
+                                     else f"{spec['ref']} * {scale:g}")
+                    conditions.append({"group": group, "field": spec["field"],
+                                       "op": spec["op"], "threshold": threshold})
+            out[rule.name] = conditions
+        return out
+
+    def stats(self):
+        return {
+            "rules": [r.spec for r in self.rules],
+            "default": self.default,
+            "hits": dict(zip(self.names, self.hits.tolist())),
+            "evaluations": self.evaluations,
+            "rows": self.rows,
+            "seconds": self.seconds,
+            "mean_us_per_evaluation": 1e6 * self.seconds / self.evaluations
+            if self.evaluations else 0.0,
+        }
+
+
+def compile_rules(config):
+    missing = [name for name in RULE_FIELDS if name not in config]
+    if missing:
+        raise RuleError(f"rules file lacks rule sets: {', '.join(missing)}")
+    return {name: RuleSet(name, config[name], RULE_FIELDS[name]) for name in RULE_FIELDS}
+
+
+class RuleEngine:
+    # Holds the compiled rule sets for one file. A reload compiles a new
+    # dict and swaps the reference, so a request that already fetched a
+    # RuleSet finishes on it; a file that fails to compile is logged and
+    # the previous rules stay active. Hit counts restart with each load.
+    def __init__(self, path=DEFAULT_RULES_PATH):
+        self.path = path
+        self.rulesets = {}
+        self.mtime_ns = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_error = None
+        self.load()
+
+    def load(self):
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding="utf-8") as f:
+            try:
+                config = json.load(f)
+            except ValueError as exc:
+                raise RuleError(f"{self.path}: {exc}") from exc
+        self.rulesets = compile_rules(config)
+        self.mtime_ns = mtime_ns
+        self.loaded_at = time.time()
+
+    def __getitem__(self, name):
+        return self.rulesets[name]
+
+    def reload_if_changed(self):
+        try:
+            if os.stat(self.path).st_mtime_ns == self.mtime_ns:
+                return False
+            self.load()
+        except Exception as exc:
+            # Anything from a missing file to a malformed rule
+            if self.last_error != str(exc):
+                logger.error("rules reload failed, keeping previous rules: %s", exc)
+            self.last_error = str(exc)
+            return False
+        self.reloads += 1
+        self.last_error = None
+        logger.info("reloaded rules from %s", self.path)
+        return True
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "rulesets": {name: rs.stats() for name, rs in self.rulesets.items()},
+        }
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Allow `python backend/score_file.py` as well as `python -m backend.score_file`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from backend.executor import available_cores, load_model_file
+from backend.rules import DEFAULT_RULES_PATH, RuleEngine
+from backend.scoring import (
+    CREDIT_FEATURES,
+    credit_labels,
+    credit_matrix,
+    fraud_probabilities,
+)
+from backend.settings import COMPILED_MAX_ROWS
+
+# ==========================
+# OFFLINE BATCH SCORER
+# ==========================
+# python -m backend.score_file transactions.csv scored.csv [--workers N]
+#                              [--chunk-rows 200000] [--resume]
+#
+# The main process only slices the input into line-aligned blocks of raw
+# bytes; a process pool (model loaded once per worker) parses, scores and
+# formats each block. Results are written strictly in input order with a
+# bounded number of blocks in flight. After every block a checkpoint
+# (<output>.progress) records the input/output byte offsets, so --resume
+# truncates the output to the last complete block and carries on.
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model")
+# Blocks are far above COMPILED_MAX_ROWS, where sklearn beats the compiled
+# forest, so the pickle is the default; a .forest given with --model hands
+# blocks to its pickle or walks them COMPILED_MAX_ROWS rows at a time
+DEFAULT_MODEL = os.path.join(MODEL_DIR, "fraud_model.pkl")
+
+# Per-worker state, set by _init_worker
+_model = None
+_rules = None
+
+
+def _init_worker(model_path, rules_path):
+    global _model, _rules
+    _model = load_model_file(model_path, compiled_max_rows=COMPILED_MAX_ROWS)
+    _rules = RuleEngine(rules_path)
+
+
+def _score_block(header, block, keep):
+    df = pd.read_csv(io.BytesIO(header + block))
+    X = credit_matrix(df[CREDIT_FEATURES].to_numpy(dtype=np.float64))
+    fraud_probs = fraud_probabilities(_model, X)
+    labels = credit_labels(X[:, 0], fraud_probs, _rules["credit"])
+
+    out = df if keep is None else df[keep]
+    out = out.assign(fraud_probability=fraud_probs, label=labels)
+    return len(df), out.to_csv(index=False, header=False).encode("utf-8")
+
+
+def read_blocks(f, chunk_rows):
+    while True:
+        lines = list(islice(f, chunk_rows))
+        if not lines:
+            return
+        yield b"".join(lines)
+
+
+class Checkpoint:
+    def __init__(self, output_path, input_path):
+        self.path = output_path + ".progress"
+        st = os.stat(input_path)
+        self.state = {
+            "input": os.path.abspath(input_path),
+            "input_size": st.st_size,
+            "input_mtime_ns": st.st_mtime_ns,
+            "input_offset": 0,
+            "output_offset": 0,
+            "rows": 0,
+            "blocks": 0,
+        }
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def restore(self):
+        with open(self.path) as f:
+            saved = json.load(f)
+        for key in ("input", "input_size", "input_mtime_ns"):
+            if saved.get(key) != self.state[key]:
+                raise SystemExit(f"{self.path} was written for a different input "
+                                 f"({key} differs); delete it to start over")
+        self.state = saved
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def score_file(input_path, output_path, model_path=DEFAULT_MODEL,
+               rules_path=DEFAULT_RULES_PATH,
+               workers=0, chunk_rows=200_000, keep=None, resume=False):
+    workers = workers or available_cores()
+    # Compile once here so a bad rules file fails before any work starts
+    RuleEngine(rules_path)
+    checkpoint = Checkpoint(output_path, input_path)
+
+    if checkpoint.exists():
+        if not resume:
+            raise SystemExit(f"{checkpoint.path} exists: pass --resume to continue "
+                             f"or delete it to start over")
+        checkpoint.restore()
+    resumed = checkpoint.state["blocks"] > 0
+
+    with open(input_path, "rb") as src:
+        header = src.readline()
+        columns = next(csv.reader([header.decode("utf-8")]))
+        missing = [c for c in CREDIT_FEATURES + (keep or []) if c not in columns]
+        if missing:
+            raise SystemExit(f"input is missing columns: {', '.join(missing)}")
+
+        if resumed:
+            src.seek(checkpoint.state["input_offset"])
+            dst = open(output_path, "r+b")
+            dst.truncate(checkpoint.state["output_offset"])
+            dst.seek(checkpoint.state["output_offset"])
+        else:
+            dst = open(output_path, "wb")
+            out_columns = (keep or columns) + ["fraud_probability", "label"]
+            dst.write((",".join(out_columns) + "\n").encode("utf-8"))
+            checkpoint.state["input_offset"] = len(header)
+            checkpoint.state["output_offset"] = dst.tell()
+
+        total_bytes = checkpoint.state["input_size"]
+        started = time.perf_counter()
+        rows_at_start = checkpoint.state["rows"]
+
+        def write(done, block_len):
+            n, data = done.result()
+            dst.write(data)
+            dst.flush()
+            state = checkpoint.state
+            state["input_offset"] += block_len
+            state["output_offset"] += len(data)
+            state["rows"] += n
+            state["blocks"] += 1
+            checkpoint.save()
+
+            elapsed = time.perf_counter() - started
+            rate = (state["rows"] - rows_at_start) / elapsed if elapsed else 0.0
+            pct = 100.0 * state["input_offset"] / total_bytes if total_bytes else 100.0
+            print(f"\r{state['rows']:>14,} rows  {pct:5.1f}%  {rate:>12,.0f} rows/s",
+                  end="", file=sys.stderr, flush=True)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_path, rules_path)) as pool:
+            in_flight = deque()
+            for block in read_blocks(src, chunk_rows):
+                in_flight.append((pool.submit(_score_block, header, block, keep), len(block)))
+                if len(in_flight) >= workers * 2:
+                    write(*in_flight.popleft())
+            while in_flight:
+                write(*in_flight.popleft())
+
+        dst.close()
+
+    elapsed = time.perf_counter() - started
+    rows = checkpoint.state["rows"] - rows_at_start
+    print(f"\nscored {rows:,} rows in {elapsed:.1f}s "
+          f"({rows / elapsed if elapsed else 0.0:,.0f} rows/s) -> {output_path}",
+          file=sys.stderr)
+    checkpoint.remove()
+    return checkpoint.state["rows"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a transactions CSV with the fraud model.")
+    parser.add_argument("input", help="CSV with at least Amount, V1, V2 columns")
+    parser.add_argument("output", help="scored CSV to write")
+    parser.add_argument("--model", default=DEFAULT_MODEL,
+                        help="fraud_model.pkl (default) or fraud_model.forest")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH,
+                        help="decision rules JSON (see backend/rules.py)")
+    parser.add_argument("--workers", type=int, default=0, help="default: all cores")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--keep", help="comma-separated input columns to copy to the output "
+                                       "(default: all)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from <output>.progress after an interruption")
+    args = parser.parse_args(argv)
+
+    score_file(
+        args.input, args.output,
+        model_path=args.model,
+        rules_path=args.rules,
+        workers=args.workers,
+        chunk_rows=args.chunk_rows,
+        keep=args.keep.split(",") if args.keep else None,
+        resume=args.resume,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import numpy as np
+
+from backend.velocity import NO_HISTORY
+
+# ==========================
+# CREDIT SCORING CORE
+# ==========================
+# Shared by the HTML form route and the JSON batch API so both produce
+# identical probabilities and labels.
+
+CREDIT_FEATURES = ["Amount", "V1", "V2"]
+
+# "Small" transactions, as counted per account by velocity.VelocityStore for
+# the salami-slicing rule
+SALAMI_AMOUNT = 50
+
+
+def credit_matrix(rows):
+    # One contiguous float64 block, shape (n, 3), ready for a single
+    # predict_proba call.
+    X = np.ascontiguousarray(rows, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != len(CREDIT_FEATURES):
+        raise ValueError(f"expected rows of {len(CREDIT_FEATURES)} features "
+                         f"({', '.join(CREDIT_FEATURES)})")
+    return X
+
+
+def fraud_probabilities(model, X):
+    return model.predict_proba(X)[:, 1]
+
+
+def credit_labels(amounts, fraud_probs, rules, account_features=None):
+    # rules: the "credit" RuleSet from backend/rules.py; account_features:
+    # velocity.FEATURES as scalars or per-row arrays, none for no account
+    labels, _ = rules.evaluate({
+        "amount": amounts,
+        "fraud_probability": fraud_probs,
+        **(account_features or NO_HISTORY),
+    })
+    return labels
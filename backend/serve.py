@@ -0,0 +1,95 @@
+import gc
+import logging
+import os
+
+# ==========================
+# PRODUCTION LAUNCHER
+# ==========================
+# python -m backend.serve
+#
+# Gunicorn master + one uvicorn worker per core. The app (model, dataset
+# mmaps, summaries) is imported once in the master before forking, so the
+# workers start hot and share those pages copy-on-write; the velocity
+# store's windows are a shared mapping, so all workers see every account's
+# transactions. Workers are recycled after a jittered number of requests
+# and drained gracefully.
+
+# Each worker already owns a core: keep per-process thread pools small
+# unless explicitly configured, and load synchronously in the master (a
+# background loader thread would not survive the fork).
+os.environ.setdefault("GREYLOCK_EXECUTOR_WORKERS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ["GREYLOCK_BACKGROUND_LOAD"] = "0"
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from backend.executor import available_cores
+from backend.settings import env_int
+
+logger = logging.getLogger("greylock")
+
+
+def _installed(module):
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+class GreylockWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "lifespan": "on",
+    }
+
+
+def launcher_options():
+    port = os.environ.get("PORT", "10000")
+    return {
+        "bind": os.environ.get("GREYLOCK_BIND", f"0.0.0.0:{port}"),
+        "workers": env_int("GREYLOCK_WORKERS", 0) or available_cores(),
+        "worker_class": "backend.serve.GreylockWorker",
+        "preload_app": True,
+        "max_requests": env_int("GREYLOCK_MAX_REQUESTS", 20000),
+        "max_requests_jitter": env_int("GREYLOCK_MAX_REQUESTS_JITTER", 2000),
+        "graceful_timeout": env_int("GREYLOCK_GRACEFUL_TIMEOUT", 30),
+        "timeout": env_int("GREYLOCK_WORKER_TIMEOUT", 60),
+        "keepalive": env_int("GREYLOCK_KEEPALIVE", 5),
+        "accesslog": os.environ.get("GREYLOCK_ACCESS_LOG") or None,
+    }
+
+
+class GreylockServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        from backend.main import app
+
+        # Move everything allocated so far out of the GC's reach so
+        # collections in the workers do not dirty (and un-share) its pages
+        gc.collect()
+        gc.freeze()
+        return app
+
+
+def main():
+    options = launcher_options()
+    logger.warning("starting %d workers on %s (loop=%s, http=%s)",
+                   options["workers"], options["bind"],
+                   GreylockWorker.CONFIG_KWARGS["loop"],
+                   GreylockWorker.CONFIG_KWARGS["http"])
+    GreylockServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
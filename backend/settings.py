@@ -0,0 +1,97 @@
+import os
+
+# ==========================
+# RUNTIME SETTINGS
+# ==========================
+# Everything tunable is read from GREYLOCK_* environment variables so the
+# same image can be configured per deployment from render.yaml.
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Micro-batching of concurrent /credit-predict calls
+BATCH_ENABLED = env_bool("GREYLOCK_BATCH_ENABLED", True)
+BATCH_WINDOW_MS = env_float("GREYLOCK_BATCH_WINDOW_MS", 2.0)
+BATCH_MAX_ROWS = env_int("GREYLOCK_BATCH_MAX_ROWS", 64)
+
+# Where predict_proba runs: "thread", "process" or "inline" (on the event
+# loop). 0 workers / 0 pending means size from the available cores.
+EXECUTOR_KIND = os.environ.get("GREYLOCK_EXECUTOR", "thread")
+EXECUTOR_WORKERS = env_int("GREYLOCK_EXECUTOR_WORKERS", 0)
+EXECUTOR_MAX_PENDING = env_int("GREYLOCK_EXECUTOR_MAX_PENDING", 0)
+
+# Memory-mapped columnar cache for the CSV datasets (see dataset_cache.py)
+DATASET_CACHE = env_bool("GREYLOCK_DATASET_CACHE", True)
+
+# Start serving before the model/datasets are loaded; /readyz reports when
+# scoring is hot. Warm-up rounds run synthetic predictions before ready.
+BACKGROUND_LOAD = env_bool("GREYLOCK_BACKGROUND_LOAD", False)
+WARMUP_ROUNDS = env_int("GREYLOCK_WARMUP_ROUNDS", 3)
+
+# Score with the flattened NumPy forest (backend/forest.py) instead of
+# sklearn's predict_proba; it is parity-checked at load time. Batches
+# larger than COMPILED_MAX_ROWS still go to sklearn, which wins there.
+COMPILED_FOREST = env_bool("GREYLOCK_COMPILED_FOREST", True)
+COMPILED_MAX_ROWS = env_int("GREYLOCK_COMPILED_MAX_ROWS", 1024)
+
+# Load backend/model/fraud_model.forest (written by train_model.py) via a
+# shared read-only mmap instead of unpickling fraud_model.pkl
+MODEL_ARTIFACT = env_bool("GREYLOCK_MODEL_ARTIFACT", True)
+
+# In-process cache of single-row predictions. Size 0 disables it;
+# precision < 0 keys on the exact floats, otherwise on inputs rounded to
+# that many decimals.
+CACHE_SIZE = env_int("GREYLOCK_CACHE_SIZE", 10000)
+CACHE_TTL = env_float("GREYLOCK_CACHE_TTL", 300.0)
+CACHE_PRECISION = env_int("GREYLOCK_CACHE_PRECISION", -1)
+
+# Rows per model call when scoring a streamed CSV/NDJSON upload
+STREAM_CHUNK_ROWS = env_int("GREYLOCK_STREAM_CHUNK_ROWS", 5000)
+
+# Decision rules (see backend/rules.py); the file is re-read when its
+# mtime changes, checked every RULES_RELOAD_SECONDS (0 disables)
+RULES_PATH = os.environ.get("GREYLOCK_RULES_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "rules.json")
+RULES_RELOAD_SECONDS = env_float("GREYLOCK_RULES_RELOAD_SECONDS", 2.0)
+
+# insurance.csv statistics are recomputed in the background when the
+# file's mtime changes, checked this often (0 disables)
+INSURANCE_RELOAD_SECONDS = env_float("GREYLOCK_INSURANCE_RELOAD_SECONDS", 5.0)
+
+# Hot reload of the scoring model (backend/model_manager.py): the model
+# files are polled this often (0 disables), and POST /admin/model/reload
+# is accepted only with an X-Admin-Token header matching ADMIN_TOKEN
+# (admin routes are refused while it is empty)
+MODEL_RELOAD_SECONDS = env_float("GREYLOCK_MODEL_RELOAD_SECONDS", 5.0)
+ADMIN_TOKEN = os.environ.get("GREYLOCK_ADMIN_TOKEN", "")
+
+# Shadow scoring (backend/shadow.py): a candidate model file under
+# backend/model re-scores SHADOW_SAMPLE_RATE of live model calls on its own
+# executor; empty disables. Agreement is measured at SHADOW_THRESHOLD.
+SHADOW_MODEL = os.environ.get("GREYLOCK_SHADOW_MODEL", "")
+SHADOW_SAMPLE_RATE = env_float("GREYLOCK_SHADOW_SAMPLE_RATE", 0.1)
+SHADOW_THRESHOLD = env_float("GREYLOCK_SHADOW_THRESHOLD", 0.5)
+SHADOW_EXECUTOR = os.environ.get("GREYLOCK_SHADOW_EXECUTOR", "thread")
+SHADOW_WORKERS = env_int("GREYLOCK_SHADOW_WORKERS", 1)
+SHADOW_MAX_PENDING = env_int("GREYLOCK_SHADOW_MAX_PENDING", 4)
+
+# Per-account velocity features (backend/velocity.py) for transactions that
+# carry an account id: at most VELOCITY_MAX_ACCOUNTS are tracked (0
+# disables), and an account idle for VELOCITY_IDLE_SECONDS is forgotten
+# (0 means the longest window, 24 h). The store is shared by the workers
+# forked by backend.serve; separately started servers each have their own.
+VELOCITY_MAX_ACCOUNTS = env_int("GREYLOCK_VELOCITY_MAX_ACCOUNTS", 50_000)
+VELOCITY_IDLE_SECONDS = env_float("GREYLOCK_VELOCITY_IDLE_SECONDS", 0.0)
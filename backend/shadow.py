@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import random
+import time
+
+import numpy as np
+
+from backend.executor import ExecutorBusy, InferenceExecutor
+from backend.metrics import Histogram, LATENCY_BUCKETS
+from backend.scoring import fraud_probabilities
+
+# ==========================
+# SHADOW SCORING
+# ==========================
+# A candidate model re-scores a random sample of live model calls on its
+# own executor, after the primary result has already been returned. The
+# request never awaits it: a sample that finds the shadow executor full is
+# dropped, not queued. Per row it records whether both models land on the
+# same side of `threshold`, the score difference, and for each sampled
+# call the candidate's latency next to the primary's.
+
+logger = logging.getLogger("greylock")
+
+DELTA_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class ShadowScorer:
+    def __init__(self, loaded, sample_rate=0.1, threshold=0.5, kind="thread",
+                 workers=1, max_pending=4, compile_forest=False, compiled_max_rows=None):
+        # loaded: a model_manager.LoadedModel for the candidate
+        self.candidate = loaded
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.executor = InferenceExecutor(
+            self._predict_sync,
+            kind=kind,
+            workers=workers,
+            max_pending=max_pending,
+            model_path=loaded.path,
+            compile_forest=compile_forest,
+            compiled_max_rows=compiled_max_rows,
+        )
+
+        self.candidate_latency = Histogram(LATENCY_BUCKETS)
+        self.primary_latency = Histogram(LATENCY_BUCKETS)
+        self.abs_delta = Histogram(DELTA_BUCKETS)
+        self.started_at = time.time()
+        self.samples = 0
+        self.rows = 0
+        self.agreed_rows = 0
+        self.delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.dropped = 0
+        self.errors = 0
+        self._tasks = set()
+
+    def _predict_sync(self, X):
+        return fraud_probabilities(self.candidate.model, X)
+
+    def observe(self, X, primary_probs, primary_seconds):
+        # Called right after a primary model call; returns immediately
+        if random.random() >= self.sample_rate:
+            return
+        if self.executor.stats()["in_flight"] >= self.executor.max_pending:
+            self.dropped += 1
+            return
+        task = asyncio.ensure_future(self._score(X, primary_probs, primary_seconds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, X, primary_probs, primary_seconds):
+        started = time.perf_counter()
+        try:
+            candidate_probs = await self.executor.run(X)
+        except ExecutorBusy:
+            self.dropped += 1
+            return
+        except Exception:
+            self.errors += 1
+            logger.exception("shadow model %s failed", self.candidate.version)
+            return
+        self.candidate_latency.observe(time.perf_counter() - started)
+        self.primary_latency.observe(primary_seconds)
+
+        primary = np.asarray(primary_probs, dtype=np.float64)
+        candidate = np.asarray(candidate_probs, dtype=np.float64)
+        delta = candidate - primary
+        abs_delta = np.abs(delta)
+        self.abs_delta.observe_many(abs_delta)
+
+        self.samples += 1
+        self.rows += len(delta)
+        self.agreed_rows += int(np.count_nonzero(
+            (primary >= self.threshold) == (candidate >= self.threshold)))
+        self.delta_sum += float(delta.sum())
+        if len(abs_delta):
+            self.max_abs_delta = max(self.max_abs_delta, float(abs_delta.max()))
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self.executor.shutdown()
+
+    def stats(self):
+        candidate = self.candidate_latency.snapshot()
+        primary = self.primary_latency.snapshot()
+        return {
+            "candidate": self.candidate.as_dict(),
+            "sample_rate": self.sample_rate,
+            "threshold": self.threshold,
+            "executor": self.executor.stats(),
+            "since": self.started_at,
+            "samples": self.samples,
+            "rows": self.rows,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "agreement_rate": self.agreed_rows / self.rows if self.rows else None,
+            "mean_delta": self.delta_sum / self.rows if self.rows else None,
+            "mean_abs_delta": self.abs_delta.snapshot()["mean"] if self.rows else None,
+            "max_abs_delta": self.max_abs_delta,
+            "candidate_mean_latency_seconds": candidate["mean"],
+            "primary_mean_latency_seconds": primary["mean"],
+        }
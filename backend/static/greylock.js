@@ -0,0 +1,70 @@
+var c = document.getElementById("matrix");
+var ctx = c.getContext("2d");
+
+c.height = window.innerHeight;
+c.width = window.innerWidth;
+
+let modeIndex = 0;
+const modes = [
+    "01",                                   // A - Binary
+    "0123456789ABCDEF",                     // B - Hex
+    "!@#$%^&*(){}[]<>?/|+-=",               // C - Symbols
+    "01GRAYLOCK"                            // D - Brand mix
+];
+
+let letters = modes[modeIndex].split("");
+let fontSize = 14;
+let columns = c.width / fontSize;
+let drops = [];
+
+for (let x = 0; x < columns; x++)
+    drops[x] = 1;
+
+// Change mode every 10 seconds
+setInterval(() => {
+    modeIndex = (modeIndex + 1) % modes.length;
+    letters = modes[modeIndex].split("");
+}, 10000);
+
+function draw() {
+    ctx.fillStyle = "rgba(0,0,0,0.08)";
+    ctx.fillRect(0,0,c.width,c.height);
+
+    ctx.fillStyle = "#00ff99";
+    ctx.font = fontSize + "px monospace";
+
+    for (let i=0; i<drops.length; i++) {
+        let text = letters[Math.floor(Math.random()*letters.length)];
+        ctx.fillText(text, i*fontSize, drops[i]*fontSize);
+
+        if (drops[i]*fontSize > c.height && Math.random() > 0.975)
+            drops[i] = 0;
+
+        drops[i]++;
+    }
+}
+
+setInterval(draw,33);
+
+function playBeep() {
+    const ctx = new (window.AudioContext || window.webkitAudioContext)();
+    const oscillator = ctx.createOscillator();
+    const gainNode = ctx.createGain();
+
+    oscillator.type = "square";
+    oscillator.frequency.setValueAtTime(800, ctx.currentTime);
+    gainNode.gain.setValueAtTime(0.05, ctx.currentTime);
+
+    oscillator.connect(gainNode);
+    gainNode.connect(ctx.destination);
+
+    oscillator.start();
+    oscillator.stop(ctx.currentTime + 0.1);
+}
+
+// Random eerie beeps every 3-8 seconds
+setInterval(() => {
+    if (Math.random() > 0.5) {
+        playBeep();
+    }
+}, Math.random() * 5000 + 3000);
@@ -0,0 +1,253 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+
+import numpy as np
+from starlette.responses import StreamingResponse
+
+from backend.executor import ExecutorBusy
+from backend.scoring import CREDIT_FEATURES
+
+# ==========================
+# STREAMING FILE SCORING
+# ==========================
+# Scores a CSV or NDJSON request body of any size. The body is split into
+# lines as it arrives, lines are grouped into fixed-size chunks, each chunk
+# is scored with one model call and its rows are written back before the
+# next chunk is read. Memory is bounded by chunk_rows x line length no
+# matter how large the upload is.
+#
+# Each row is parsed as it is buffered. A malformed row ends the stream:
+# the rows before it are still scored and written, then the trailer
+# reports the error and the data line it was on.
+#
+# A chunk that meets a full inference executor is retried for up to
+# BUSY_RETRY_SECONDS; the upload is not read meanwhile, so the client is
+# held back rather than rows dropped. If the chunk still cannot be scored
+# (or scoring fails), the stream ends the same way, with the trailer
+# naming the data lines that were not scored.
+#
+# CSV in  -> CSV out: input columns + fraud_probability,label; a final
+#            "# rows=... seconds=... rows_per_second=..." line.
+# NDJSON in -> NDJSON out: input object + fraud_probability/label; a final
+#            {"summary": {...}} object.
+
+logger = logging.getLogger("greylock")
+
+STREAM_FORMATS = ("csv", "ndjson")
+MAX_LINE_BYTES = 64 * 1024
+
+BUSY_RETRY_SECONDS = 5.0
+BUSY_RETRY_DELAY = 0.05
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+class StreamScoringError(Exception):
+    pass
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    # StreamingResponse normally listens for client disconnects on
+    # `receive` while streaming, which would swallow the request body we
+    # are still reading. Here the body iterator owns `receive` (and sees
+    # the disconnect itself).
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def detect_format(content_type, override=None):
+    if override:
+        if override not in STREAM_FORMATS:
+            raise StreamFormatError(f"format must be one of {STREAM_FORMATS}")
+        return override
+    if content_type and "json" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+async def iter_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise StreamFormatError(f"line longer than {MAX_LINE_BYTES} bytes")
+        for line in lines:
+            line = line.rstrip(b"\r")
+            if line:
+                yield line.decode("utf-8")
+    if buffer.strip():
+        yield buffer.rstrip(b"\r").decode("utf-8")
+
+
+def _feature_positions(names):
+    lowered = [n.strip().lower() for n in names]
+    try:
+        return [lowered.index(f.lower()) for f in CREDIT_FEATURES]
+    except ValueError:
+        raise StreamFormatError(f"header must contain {', '.join(CREDIT_FEATURES)}")
+
+
+def _csv_features(row, positions):
+    try:
+        return [float(row[i]) for i in positions]
+    except (IndexError, ValueError):
+        raise StreamFormatError(f"each row needs numeric {', '.join(CREDIT_FEATURES)}")
+
+
+def _ndjson_features(record):
+    if not isinstance(record, dict):
+        raise StreamFormatError("each line must be a JSON object")
+    lowered = {k.lower(): v for k, v in record.items()}
+    try:
+        return [float(lowered[f.lower()]) for f in CREDIT_FEATURES]
+    except (KeyError, TypeError, ValueError):
+        raise StreamFormatError(f"each object needs numeric {', '.join(CREDIT_FEATURES)}")
+
+
+def _ndjson_row(line):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise StreamFormatError("invalid JSON")
+    return record, _ndjson_features(record)
+
+
+class StreamScorer:
+    def __init__(self, predict, label, chunk_rows=5000):
+        # predict: async (n, 3) matrix -> n probabilities
+        # label: (amounts, probabilities) -> n labels
+        self.predict = predict
+        self.label = label
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.rows = 0
+        self.started = None
+
+    def summary(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(self.rows / seconds, 1) if seconds > 0 else 0.0,
+        }
+
+    async def _score(self, features):
+        X = np.asarray(features, dtype=np.float64)
+        lines = f"data lines {self.rows + 1}-{self.rows + len(X)}"
+        delay = BUSY_RETRY_DELAY
+        deadline = time.perf_counter() + BUSY_RETRY_SECONDS
+        while True:
+            try:
+                probs = await self.predict(X)
+                break
+            except ExecutorBusy:
+                if time.perf_counter() + delay > deadline:
+                    raise StreamScoringError(f"{lines} not scored: scoring capacity exhausted")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.5)
+            except Exception as exc:
+                logger.exception("stream scoring failed on %s", lines)
+                raise StreamScoringError(f"{lines} not scored: {exc.__class__.__name__}") from exc
+        labels = self.label(X[:, 0], probs)
+        self.rows += len(X)
+        return probs, labels
+
+    def _bad_line(self, exc, buffered):
+        return StreamFormatError(f"data line {self.rows + buffered + 1}: {exc}")
+
+    async def csv(self, lines):
+        header = None
+        positions = None
+        chunk = []
+        features = []
+
+        async def flush():
+            probs, labels = await self._score(features)
+            out = io.StringIO()
+            writer = csv.writer(out, lineterminator="\n")
+            for row, p, lab in zip(chunk, probs, labels):
+                writer.writerow(row + [f"{p:.6f}", lab])
+            chunk.clear()
+            features.clear()
+            return out.getvalue()
+
+        async for line in lines:
+            row = next(csv.reader([line]))
+            if header is None:
+                header = row
+                positions = _feature_positions(header)
+                yield ",".join(header + ["fraud_probability", "label"]) + "\n"
+                continue
+            try:
+                features.append(_csv_features(row, positions))
+            except StreamFormatError as exc:
+                error = self._bad_line(exc, len(chunk))
+                if chunk:
+                    yield await flush()
+                raise error
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                yield await flush()
+
+        if chunk:
+            yield await flush()
+
+    async def ndjson(self, lines):
+        records = []
+        features = []
+
+        async def flush():
+            probs, labels = await self._score(features)
+            out = []
+            for record, p, lab in zip(records, probs, labels):
+                record["fraud_probability"] = float(p)
+                record["label"] = str(lab)
+                out.append(json.dumps(record, ensure_ascii=False))
+            records.clear()
+            features.clear()
+            return "\n".join(out) + "\n"
+
+        async for line in lines:
+            try:
+                record, row_features = _ndjson_row(line)
+            except StreamFormatError as exc:
+                error = self._bad_line(exc, len(records))
+                if records:
+                    yield await flush()
+                raise error
+            records.append(record)
+            features.append(row_features)
+            if len(records) >= self.chunk_rows:
+                yield await flush()
+
+        if records:
+            yield await flush()
+
+    async def stream(self, chunks, fmt):
+        self.started = time.perf_counter()
+        body = self.csv(iter_lines(chunks)) if fmt == "csv" else self.ndjson(iter_lines(chunks))
+
+        try:
+            async for piece in body:
+                yield piece.encode("utf-8")
+            error = None
+        except (StreamFormatError, StreamScoringError, ValueError, IndexError) as exc:
+            error = str(exc) or exc.__class__.__name__
+
+        summary = self.summary()
+        if error is not None:
+            summary["error"] = error
+        logger.info("stream scoring finished: %s", summary)
+
+        if fmt == "ndjson":
+            yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
+        else:
+            yield ("# " + " ".join(f"{k}={v}" for k, v in summary.items()) + "\n").encode("utf-8")
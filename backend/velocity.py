@@ -0,0 +1,326 @@
+import hashlib
+import mmap
+import multiprocessing
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+# ==========================
+# ACCOUNT VELOCITY FEATURES
+# ==========================
+# Per-account transaction counts and amounts over trailing windows, so a
+# rule can look at who is transacting instead of at the whole dataset.
+#
+# Each window is a ring of fixed-width time buckets. A transaction adds to
+# the bucket for the current time, clearing it first if the ring has come
+# round since that slot was last written; a lookup sums the slots whose
+# bucket still falls inside the window. Both touch a fixed number of slots
+# however long an account's history is. Windows slide one bucket at a time:
+# "1m" is the current 10-second bucket plus the five before it.
+#
+# Accounts live in a set-associative table: an account's hash picks a set
+# of WAYS rows, and a new account takes the least recently seen row of its
+# set. Memory is fixed by max_accounts, and an account idle for
+# idle_seconds (by default the longest window, after which its features
+# are all zero anyway) no longer counts.
+#
+# The table sits in one anonymous shared mapping created at import, so the
+# gunicorn workers forked by backend.serve all read and write the same
+# windows; a process-shared lock guards every read and write. Separately
+# started processes (e.g. several uvicorn instances) each keep their own.
+# Batches take the lock CHUNK_KEYS accounts at a time, so a single
+# transaction never waits long; if the lock cannot be had within
+# LOCK_TIMEOUT, its accounts get no history or are not recorded, and the
+# skipped rows are counted.
+#
+# Reads and writes are split: features() gives an account's features as if
+# the transaction were recorded, and record() is called once it has been
+# scored, so a request that fails and is retried is only counted once.
+
+# name -> (window seconds, buckets)
+WINDOWS = {"1m": (60, 6), "1h": (3600, 12), "24h": (86400, 24)}
+
+FEATURES = tuple(f"account_{kind}_{name}"
+                 for name in WINDOWS for kind in ("tx", "amount", "small_tx"))
+
+# Rule context for a transaction without an account
+NO_HISTORY = dict.fromkeys(FEATURES, 0)
+
+WAYS = 4
+
+# A worker killed while holding the lock must not stall the others for good
+LOCK_TIMEOUT = 0.1
+
+# Accounts handled per lock acquisition
+CHUNK_KEYS = 1024
+
+# Shared counters, updated under the lock
+_EVENTS, _EXPIRATIONS, _EVICTIONS, _DROPPED = range(4)
+
+# Rows skipped because the lock timed out, counted outside it
+_SKIPPED_FEATURES, _SKIPPED_RECORDS = range(2)
+
+# Rows of a slot's totals: count, small-transaction count, amount
+_KINDS = np.arange(3)[:, None]
+
+
+def account_key(account):
+    # Stable across processes (unlike hash()); 0 marks an empty row
+    digest = hashlib.blake2b(account.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") | 1
+
+
+def _chunks(n):
+    return [slice(start, start + CHUNK_KEYS) for start in range(0, n, CHUNK_KEYS)]
+
+
+def _running_sums(inverse, values):
+    # Inclusive running total of values (n, k) within each group, in order
+    order = np.argsort(inverse, kind="stable")
+    ordered = values[order]
+    csum = np.cumsum(ordered, axis=0)
+    grouped = inverse[order]
+    start = np.searchsorted(grouped, grouped)
+    out = np.empty_like(values)
+    out[order] = csum - (csum[start] - ordered[start])
+    return out
+
+
+class VelocityStore:
+    def __init__(self, small_amount, max_accounts=50_000, idle_seconds=None):
+        self.small_amount = small_amount
+        self.idle_seconds = idle_seconds or max(s for s, _ in WINDOWS.values())
+        self.sets = max_accounts // WAYS
+        self.max_accounts = self.sets * WAYS
+
+        # Slots of all windows side by side; per slot its bucket width and
+        # ring size, and per window the index of its first slot
+        widths, sizes, offsets = [], [], []
+        for seconds, buckets in WINDOWS.values():
+            offsets.append(len(widths))
+            widths += [seconds // buckets] * buckets
+            sizes += [buckets] * buckets
+        self._width = np.array(widths, dtype=np.int64)
+        self._size = np.array(sizes, dtype=np.int64)
+        self._offsets = np.array(offsets, dtype=np.intp)
+        self._window_width = self._width[self._offsets]
+        self._window_size = self._size[self._offsets]
+
+        # Per row: account key, last seen, and per slot the bucket number it
+        # holds plus its count, small-transaction count and amount (float64
+        # counts are exact far beyond any window). Pages of the mapping only
+        # become resident once a row is used.
+        slots = len(widths)
+        layout = [
+            ("_keys", np.uint64, (self.max_accounts,)),
+            ("_last_seen", np.float64, (self.max_accounts,)),
+            ("_bucket", np.int64, (self.max_accounts, slots)),
+            ("_totals", np.float64, (self.max_accounts, 3, slots)),
+            ("_counters", np.int64, (4,)),
+        ]
+        self.reserved_bytes = sum(np.dtype(t).itemsize * int(np.prod(s)) for _, t, s in layout)
+        self._shm = mmap.mmap(-1, max(self.reserved_bytes, 1))
+        offset = 0
+        for name, dtype, shape in layout:
+            count = int(np.prod(shape))
+            setattr(self, name, np.frombuffer(self._shm, dtype=dtype, count=count,
+                                              offset=offset).reshape(shape))
+            offset += count * np.dtype(dtype).itemsize
+        self._lock = multiprocessing.Lock()
+        self._skipped = multiprocessing.Array("q", 2)
+
+    @property
+    def enabled(self):
+        return self.max_accounts > 0
+
+    @contextmanager
+    def _locked(self):
+        # -> whether the lock is held; the table must not be touched if not
+        acquired = self._lock.acquire(timeout=LOCK_TIMEOUT)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._lock.release()
+
+    def _skip(self, which, rows):
+        with self._skipped.get_lock():
+            self._skipped[which] += rows
+
+    def features(self, account, amount, now=None):
+        # The account's features as if this transaction were recorded
+        columns = self.features_many([account], [amount], now)
+        return {name: column[0].item() for name, column in columns.items()}
+
+    def record(self, account, amount, now=None):
+        self.record_many([account], [amount], now)
+
+    def features_many(self, accounts, amounts, now=None):
+        # accounts[i] (None for no account) paid amounts[i]; each row counts
+        # itself and the rows before it for the same account
+        now = time.time() if now is None else now
+        out = {name: np.zeros(len(accounts)) for name in FEATURES}
+        grouped = self._group(accounts, amounts)
+        if grouped is None:
+            return out
+        present, keys, inverse, values = grouped
+
+        base = np.zeros((len(keys), 3, len(WINDOWS)))
+        known = np.ones(len(keys), dtype=bool)
+        for chunk in _chunks(len(keys)):
+            with self._locked() as locked:
+                if locked:
+                    base[chunk] = self._window_totals(self._find(keys[chunk], now), now)
+            known[chunk] = locked
+        columns = base[inverse] + _running_sums(inverse, values)[:, :, None]
+        unknown = ~known[inverse]
+        if unknown.any():
+            # As for a transaction without an account
+            columns[unknown] = 0
+            self._skip(_SKIPPED_FEATURES, int(unknown.sum()))
+        for i, name in enumerate(WINDOWS):
+            out[f"account_tx_{name}"][present] = columns[:, 0, i]
+            out[f"account_small_tx_{name}"][present] = columns[:, 1, i]
+            out[f"account_amount_{name}"][present] = columns[:, 2, i]
+        return out
+
+    def record_many(self, accounts, amounts, now=None):
+        now = time.time() if now is None else now
+        grouped = self._group(accounts, amounts)
+        if grouped is None:
+            return
+        _, keys, inverse, values = grouped
+
+        adds = np.zeros((len(keys), 3))
+        np.add.at(adds, inverse, values)
+        recency = np.zeros(len(keys), dtype=np.intp)
+        np.maximum.at(recency, inverse, np.arange(len(inverse)))
+
+        for chunk in _chunks(len(keys)):
+            with self._locked() as locked:
+                if locked:
+                    self._record_chunk(keys[chunk], adds[chunk], recency[chunk], now)
+            if not locked:
+                self._skip(_SKIPPED_RECORDS, int(adds[chunk, 0].sum()))
+
+    def _record_chunk(self, keys, adds, recency, now):
+        rows = self._find(keys, now)
+        self._last_seen[rows[rows >= 0]] = now
+        missing = np.flatnonzero(rows < 0)
+        if len(missing):
+            rows[missing] = self._claim(keys[missing], recency[missing], now)
+        kept = rows >= 0
+        self._add(rows[kept], adds[kept], now)
+        self._counters[_EVENTS] += int(adds[kept, 0].sum())
+
+    def _group(self, accounts, amounts):
+        # -> positions with an account, unique keys, key index per position,
+        # and per position (1, is small, amount)
+        if not self.enabled:
+            return None
+        present = [i for i, account in enumerate(accounts) if account]
+        if not present:
+            return None
+        if len(present) == 1:
+            names, inverse = [accounts[present[0]]], np.zeros(1, dtype=np.intp)
+        else:
+            names, inverse = np.unique(np.array([accounts[i] for i in present], dtype=object),
+                                       return_inverse=True)
+        keys = np.array([account_key(name) for name in names], dtype=np.uint64)
+        amounts = np.asarray(amounts, dtype=np.float64)[present]
+        values = np.empty((len(present), 3))
+        values[:, 0] = 1
+        values[:, 1] = amounts < self.small_amount
+        values[:, 2] = amounts
+        return np.asarray(present), keys, inverse.ravel(), values
+
+    def _candidates(self, keys):
+        # The low bit is always set, so the set comes from the bits above it
+        sets = ((keys >> np.uint64(1)) % np.uint64(self.sets)).astype(np.intp)
+        return sets, sets[:, None] * WAYS + np.arange(WAYS)
+
+    def _find(self, keys, now):
+        # Row per key, -1 for accounts not seen within idle_seconds
+        _, rows = self._candidates(keys)
+        match = ((self._keys[rows] == keys[:, None])
+                 & (self._last_seen[rows] >= now - self.idle_seconds))
+        found = rows[np.arange(len(keys)), match.argmax(axis=1)]
+        return np.where(match.any(axis=1), found, -1)
+
+    def _claim(self, keys, recency, now):
+        # Rows for new accounts: the least recently seen rows of each set,
+        # skipping rows already touched at `now`. Past the free rows of a
+        # set, the accounts seen earliest in the batch are not recorded.
+        sets, rows = self._candidates(keys)
+        order = np.lexsort((-recency, sets))
+        ordered_sets = sets[order]
+        rank = np.arange(len(order)) - np.searchsorted(ordered_sets, ordered_sets)
+
+        candidates = rows[order]
+        last_seen = self._last_seen[candidates]
+        stalest = np.argsort(last_seen, axis=1, kind="stable")
+        kept = rank < (last_seen < now).sum(axis=1)
+        pick = np.arange(len(order))[kept]
+        victims = candidates[pick, stalest[pick, rank[kept]]]
+
+        live = ((self._keys[victims] != 0)
+                & (self._last_seen[victims] >= now - self.idle_seconds))
+        self._counters[_EVICTIONS] += int(live.sum())
+        self._counters[_EXPIRATIONS] += int((self._keys[victims] != 0).sum() - live.sum())
+        self._counters[_DROPPED] += int((~kept).sum())
+
+        self._keys[victims] = keys[order[kept]]
+        self._last_seen[victims] = now
+        self._bucket[victims] = 0
+
+        out = np.full(len(keys), -1, dtype=np.intp)
+        out[order[kept]] = victims
+        return out
+
+    def _add(self, rows, adds, now):
+        bucket = int(now) // self._window_width
+        slots = self._offsets + bucket % self._window_size
+        index = rows[:, None], slots
+        fresh = self._bucket[index] == bucket
+        self._bucket[index] = bucket
+        index = rows[:, None, None], _KINDS, slots
+        self._totals[index] = self._totals[index] * fresh[:, None, :] + adds[:, :, None]
+
+    def _window_totals(self, rows, now):
+        # (rows, [count, small count, amount], window), zero where rows < 0
+        out = np.zeros((len(rows), 3, len(WINDOWS)))
+        found = rows >= 0
+        if found.any():
+            r = rows[found]
+            live = self._bucket[r] > int(now) // self._width - self._size
+            out[found] = np.add.reduceat(self._totals[r] * live[:, None, :],
+                                         self._offsets, axis=2)
+        return out
+
+    def stats(self):
+        # Read without the lock (it runs on the event loop): a snapshot that
+        # may be a batch chunk behind, never a write
+        now = time.time()
+        accounts = int(np.count_nonzero(
+            (self._keys != 0) & (self._last_seen >= now - self.idle_seconds)))
+        counters = self._counters.tolist()
+        with self._skipped.get_lock():
+            skipped = self._skipped[:]
+        return {
+            "accounts": accounts,
+            "max_accounts": self.max_accounts,
+            "ways": WAYS,
+            "idle_seconds": self.idle_seconds,
+            "windows": {name: {"seconds": seconds, "buckets": buckets}
+                        for name, (seconds, buckets) in WINDOWS.items()},
+            "small_amount": self.small_amount,
+            "events": counters[_EVENTS],
+            "expirations": counters[_EXPIRATIONS],
+            "evictions": counters[_EVICTIONS],
+            "dropped": counters[_DROPPED],
+            # rows given no history / not recorded because the lock timed out
+            "skipped_features": skipped[_SKIPPED_FEATURES],
+            "skipped_records": skipped[_SKIPPED_RECORDS],
+            "reserved_bytes": self.reserved_bytes,
+        }
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+# ==========================
+# ENDPOINT BENCHMARK
+# ==========================
+# Drives the app with a fixed number of concurrent clients per endpoint
+# and reports p50/p95/p99 latency, requests/second and error rate.
+#
+#   python benchmarks/endpoints.py --mode asgi   --concurrency 32 --requests 2000
+#   python benchmarks/endpoints.py --mode socket --save bench.json
+#   python benchmarks/endpoints.py --baseline bench.json --tolerance 0.15
+#
+# "asgi" calls the ASGI app in-process (framework + handler cost only);
+# "socket" starts uvicorn on a free local port and talks HTTP/1.1 over
+# keep-alive connections (adds the server and the network stack). With
+# --baseline, endpoints whose p99 grew or whose throughput fell by more
+# than --tolerance are flagged and the exit status is 1. When both a form
+# route and its /api/v1 JSON twin ran, the per-request saving is printed.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FORM = "application/x-www-form-urlencoded"
+JSON = "application/json"
+
+
+def credit_form(rng):
+    # Fresh feature values per request so the prediction cache does not
+    # turn the benchmark into a cache benchmark
+    return urlencode({"amount": f"{rng.expovariate(1 / 90):.2f}",
+                      "v1": f"{rng.gauss(0, 1):.4f}", "v2": f"{rng.gauss(0, 1):.4f}"})
+
+
+def insurance_form(rng):
+    return urlencode({"claim": f"{rng.uniform(500, 90000):.0f}",
+                      "numclaims": str(rng.randint(0, 8))})
+
+
+def credit_json(rng):
+    return json.dumps({"amount": round(rng.expovariate(1 / 90), 2),
+                       "v1": round(rng.gauss(0, 1), 4), "v2": round(rng.gauss(0, 1), 4)})
+
+
+def insurance_json(rng):
+    return json.dumps({"claim": round(rng.uniform(500, 90000)), "numclaims": rng.randint(0, 8)})
+
+
+# name -> (method, path, content type, body or body(rng))
+ENDPOINTS = {
+    "home": ("GET", "/", None, None),
+    "credit_page": ("GET", "/credit", None, None),
+    "credit_predict": ("POST", "/credit-predict", FORM, credit_form),
+    "insurance_page": ("GET", "/insurance", None, None),
+    "insurance_predict": ("POST", "/insurance-predict", FORM, insurance_form),
+    "credit_api": ("POST", "/api/v1/credit/score", JSON, credit_json),
+    "insurance_api": ("POST", "/api/v1/insurance/score", JSON, insurance_json),
+}
+
+# (form route, JSON route) pairs reported side by side when both ran
+PAIRS = [("credit_predict", "credit_api"), ("insurance_predict", "insurance_api")]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p95_ms": percentile(latencies, 95) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1e3,
+    }
+
+
+# ==========================
+# IN-PROCESS ASGI DRIVER
+# ==========================
+class AsgiClient:
+    def __init__(self, app):
+        self.app = app
+        self._lifespan = None
+        self._lifespan_queue = asyncio.Queue()
+        self._lifespan_events = asyncio.Queue()
+
+    async def start(self):
+        async def receive():
+            return await self._lifespan_queue.get()
+
+        async def send(message):
+            await self._lifespan_events.put(message)
+
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.4"}}
+        self._lifespan = asyncio.create_task(self.app(scope, receive, send))
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        message = await self._lifespan_events.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"app startup failed: {message}")
+
+    async def stop(self):
+        await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+        await self._lifespan_events.get()
+        await self._lifespan
+
+    async def request(self, method, path, content_type, body):
+        body = (body or "").encode()
+        headers = [(b"host", b"bench")]
+        if content_type:
+            headers += [(b"content-type", content_type.encode()),
+                        (b"content-length", str(len(body)).encode())]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": "1.1", "method": method, "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": b"",
+            "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 80),
+        }
+        sent = False
+        status = None
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.app(scope, receive, send)
+        return status
+
+
+# ==========================
+# LOCAL SOCKET DRIVER
+# ==========================
+class SocketClient:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._pool = []
+
+    async def _connection(self):
+        if self._pool:
+            return self._pool.pop()
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, content_type, body):
+        reader, writer = await self._connection()
+        body = (body or "").encode()
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+        if content_type:
+            head += f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        length, chunked, close = 0, False, False
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        if chunked:
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(length)
+
+        if close:
+            writer.close()
+        else:
+            self._pool.append((reader, writer))
+        return status
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(port):
+    import uvicorn
+
+    config = uvicorn.Config("backend.main:app", host="127.0.0.1", port=port,
+                            log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 120
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+# ==========================
+# LOAD GENERATION
+# ==========================
+async def run_endpoint(client, spec, concurrency, requests, warmup, seed=0):
+    method, path, content_type, body = spec
+    rng = random.Random(seed)
+    make_body = body if callable(body) else (lambda rng: body)
+
+    for _ in range(warmup):
+        await client.request(method, path, content_type, make_body(rng))
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            payload = make_body(rng)
+            started = time.perf_counter()
+            try:
+                status = await client.request(method, path, content_type, payload)
+            except Exception:
+                errors += 1
+                continue
+            if 200 <= status < 400:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(args):
+    names = args.endpoints or list(ENDPOINTS)
+    results = {}
+
+    if args.mode == "asgi":
+        from backend.main import app
+        client = AsgiClient(app)
+        await client.start()
+    else:
+        server, thread = start_uvicorn(free_port())
+        client = SocketClient("127.0.0.1", server.config.port)
+
+    try:
+        for name in names:
+            # Distinct seeds so one endpoint never replays another's rows
+            # into the prediction cache
+            results[name] = await run_endpoint(client, ENDPOINTS[name], args.concurrency,
+                                               args.requests, args.warmup,
+                                               seed=list(ENDPOINTS).index(name))
+            r = results[name]
+            print(f"{name:<18} {r['rps']:>9.0f} req/s  p50 {r['p50_ms']:7.2f} ms  "
+                  f"p95 {r['p95_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms  "
+                  f"errors {r['error_rate']:.2%}")
+    finally:
+        if args.mode == "asgi":
+            await client.stop()
+        else:
+            server.should_exit = True
+
+    return results
+
+
+def print_pairs(results):
+    for form, api in PAIRS:
+        if form not in results or api not in results:
+            continue
+        f, a = results[form], results[api]
+        saved_us = (f["p50_ms"] - a["p50_ms"]) * 1e3
+        speedup = a["rps"] / f["rps"] if f["rps"] else 0.0
+        print(f"{api} vs {form}: p50 {saved_us:+.0f} us/request saved, "
+              f"{speedup:.2f}x throughput")
+
+
+def compare(results, baseline, tolerance, mode):
+    if baseline.get("meta", {}).get("mode") != mode:
+        print(f"warning: baseline was recorded in {baseline.get('meta', {}).get('mode')!r} "
+              f"mode, this run is {mode!r}")
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        if before["p99_ms"] and current["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {before['p99_ms']:.2f} -> {current['p99_ms']:.2f} ms")
+        if before["rps"] and current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['rps']:.0f} -> {current['rps']:.0f} req/s")
+        if current["error_rate"] > before["error_rate"]:
+            regressions.append(f"{name}: error rate {before['error_rate']:.2%} -> "
+                               f"{current['error_rate']:.2%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HTTP endpoints.")
+    parser.add_argument("--mode", choices=["asgi", "socket"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="per endpoint")
+    parser.add_argument("--endpoints", nargs="*", choices=list(ENDPOINTS))
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_all(args))
+    print_pairs(results)
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.mode)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# ==========================
+# MODEL LOAD BENCHMARK
+# ==========================
+# joblib.load(fraud_model.pkl) vs CompiledForest.load(fraud_model.forest).
+# Each loader runs in a fresh interpreter so RSS is not polluted by the
+# other one. RssAnon is private memory (multiplied by every worker);
+# RssFile is page cache shared by all processes mapping the same file.
+#
+#   python benchmarks/model_load.py [--repeat 5]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, "backend", "model")
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+
+def rss():
+    fields = {{}}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                fields[key] = int(value.split()[0]) * 1024
+    return fields
+
+import numpy as np
+import joblib
+import sklearn.ensemble  # time the unpickle, not the sklearn import
+from backend.forest import CompiledForest
+
+before = rss()
+started = time.perf_counter()
+if {kind!r} == "joblib":
+    model = joblib.load({path!r})
+else:
+    model = CompiledForest.load({path!r})
+    # Touch every page once, as real scoring eventually does
+    for name in ("feature", "threshold", "children", "value", "roots"):
+        getattr(model, name).sum()
+elapsed = time.perf_counter() - started
+after = rss()
+
+print(json.dumps({{"seconds": elapsed,
+                  **{{k: after[k] - before.get(k, 0) for k in after}}}}))
+"""
+
+
+def run_child(kind, path):
+    code = CHILD.format(root=ROOT, kind=kind, path=path)
+    out = subprocess.run([sys.executable, "-c", code], check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pkl", default=os.path.join(MODEL_DIR, "fraud_model.pkl"))
+    parser.add_argument("--forest", default=os.path.join(MODEL_DIR, "fraud_model.forest"))
+    args = parser.parse_args()
+
+    print(f"{'loader':<8} {'file MB':>8} {'load ms':>9} {'RSS MB':>8} "
+          f"{'anon MB':>8} {'file-backed MB':>15}")
+    for kind, path in (("joblib", args.pkl), ("mmap", args.forest)):
+        runs = [run_child(kind, path) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["seconds"])
+        print(f"{kind:<8} {os.path.getsize(path) / 1e6:8.2f} "
+              f"{best['seconds'] * 1e3:9.2f} {best['VmRSS'] / 1e6:8.2f} "
+              f"{best['RssAnon'] / 1e6:8.2f} {best['RssFile'] / 1e6:15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import pandas as pd
+from backend.dataset_cache import load_csv
 
 # Load dataset
-df = pd.read_csv("creditcard.csv")
+df = load_csv("creditcard.csv")
 
 print("Dataset Shape:", df.shape)
 print("\nFirst 5 rows:")
@@ -0,0 +1,67 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from backend.dataset_cache import file_sha256
+from backend.forest import CompiledForest, pickle_path_for, synthetic_rows, verify_parity
+
+
+@pytest.fixture(scope="module")
+def model():
+    X = synthetic_rows(4000, seed=1)
+    y = ((X[:, 1] > 0.5) ^ (X[:, 0] > 150)).astype(int)
+    return RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return synthetic_rows(5000, seed=2)
+
+
+def test_compiled_matches_sklearn(model, rows):
+    compiled = CompiledForest.from_sklearn(model)
+    assert verify_parity(compiled, model, rows) <= 1e-9
+    np.testing.assert_allclose(compiled.predict_proba(rows), model.predict_proba(rows),
+                               atol=1e-9)
+
+
+def test_artifact_round_trip_matches_sklearn(model, rows, tmp_path):
+    path = str(tmp_path / "fraud_model.forest")
+    CompiledForest.from_sklearn(model).save(path, metadata={"fit_key": "test"})
+
+    loaded = CompiledForest.load(path)
+    assert loaded.metadata == {"fit_key": "test"}
+    assert loaded.n_trees == 25
+    # Probabilities are stored as float32
+    assert verify_parity(loaded, model, rows, atol=1e-6) <= 1e-6
+
+
+def test_parity_check_rejects_a_different_model(model, rows):
+    X = synthetic_rows(4000, seed=3)
+    other = RandomForestClassifier(n_estimators=5, random_state=1).fit(X, X[:, 2] > 0)
+    with pytest.raises(ValueError, match="deviates"):
+        verify_parity(CompiledForest.from_sklearn(other), model, rows)
+
+
+def test_artifact_hands_large_batches_to_its_pickle(model, rows, tmp_path):
+    path = str(tmp_path / "fraud_model.forest")
+    joblib.dump(model, pickle_path_for(path))
+    CompiledForest.from_sklearn(model).save(
+        path, metadata={"pickle_sha256": file_sha256(pickle_path_for(path))})
+
+    loaded = CompiledForest.load(path, max_rows=100, fallback_path=pickle_path_for(path))
+    loaded.predict_proba(rows[:100])
+    assert loaded.fallback is None
+    np.testing.assert_allclose(loaded.predict_proba(rows), model.predict_proba(rows), atol=1e-12)
+    assert loaded.fallback is not None
+
+
+def test_artifact_chunks_large_batches_without_a_matching_pickle(model, rows, tmp_path):
+    path = str(tmp_path / "fraud_model.forest")
+    joblib.dump(model, pickle_path_for(path))
+    CompiledForest.from_sklearn(model).save(path, metadata={"pickle_sha256": "stale"})
+
+    loaded = CompiledForest.load(path, max_rows=100, fallback_path=pickle_path_for(path))
+    np.testing.assert_allclose(loaded.predict_proba(rows), model.predict_proba(rows), atol=1e-6)
+    assert loaded.fallback is None
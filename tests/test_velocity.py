@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from backend.velocity import FEATURES, NO_HISTORY, WINDOWS, VelocityStore, account_key
+
+# Start of a 24 h bucket, so every window's buckets start here too
+T0 = 1_700_006_400.0
+assert T0 % 86400 == 0
+
+
+@pytest.fixture
+def store():
+    return VelocityStore(50, max_accounts=64)
+
+
+def test_batch_running_counts_match_a_per_row_loop():
+    rng = np.random.default_rng(0)
+    accounts = [f"acct-{rng.integers(20)}" if rng.random() < 0.9 else None
+                for _ in range(500)]
+    amounts = rng.uniform(0, 100, len(accounts))
+    batched = VelocityStore(50, max_accounts=256)
+    looped = VelocityStore(50, max_accounts=256)
+
+    for step in range(3):
+        now = T0 + step * 700
+        columns = batched.features_many(accounts, amounts, now)
+        batched.record_many(accounts, amounts, now)
+        for i, (account, amount) in enumerate(zip(accounts, amounts)):
+            expected = NO_HISTORY
+            if account:
+                expected = looped.features(account, amount, now)
+                looped.record(account, amount, now)
+            for name in FEATURES:
+                assert columns[name][i] == pytest.approx(expected[name]), (step, i, name)
+
+    assert batched.stats()["events"] == looped.stats()["events"]
+
+
+def test_features_then_record_counts_a_row_once(store):
+    assert store.features("a", 10, T0)["account_tx_1m"] == 1
+    # Not recorded yet, e.g. the request failed and is being retried
+    assert store.features("a", 10, T0)["account_tx_1m"] == 1
+    store.record("a", 10, T0)
+    after = store.features("a", 60, T0 + 1)
+    assert after["account_tx_1m"] == 2
+    assert after["account_small_tx_1m"] == 1
+    assert after["account_amount_1m"] == 70
+    assert store.stats()["events"] == 1
+
+
+@pytest.mark.parametrize("name", list(WINDOWS))
+def test_windows_slide_one_bucket_at_a_time(store, name):
+    seconds, buckets = WINDOWS[name]
+    width = seconds // buckets
+    store.record("a", 10, T0)
+
+    def seen(now):
+        # Features include the transaction being scored, so history is one less
+        return store.features("a", 10, now)[f"account_tx_{name}"] - 1
+
+    # Counted while its bucket is one of the last `buckets`...
+    assert seen(T0 + seconds - width) == 1
+    assert seen(T0 + seconds - 1) == 1
+    # ...and gone once the window has moved a whole window past it
+    assert seen(T0 + seconds) == 0
+
+
+def test_idle_account_expires_and_its_row_is_reused():
+    store = VelocityStore(50, max_accounts=4, idle_seconds=60)
+    store.record("a", 10, T0)
+    # Still within its 1h window, but forgotten once idle for over 60 s
+    assert store.features("a", 10, T0 + 60)["account_tx_1h"] == 2
+    assert store.features("a", 10, T0 + 61)["account_tx_1h"] == 1
+
+    store.record_many(["b", "c", "d", "e"], [1, 1, 1, 1], T0 + 61)
+    stats = store.stats()
+    assert stats["expirations"] == 1
+    assert stats["evictions"] == 0
+    assert stats["dropped"] == 0
+
+
+def test_full_table_evicts_least_recent_then_drops():
+    store = VelocityStore(50, max_accounts=8)
+    assert store.max_accounts == 8
+    first = [f"first-{i}" for i in range(40)]
+    store.record_many(first, np.ones(len(first)), T0)
+    stats = store.stats()
+    # 2 sets of 4 rows; past those, the accounts seen earliest are dropped
+    assert stats["events"] == 8
+    assert stats["dropped"] == 32
+    assert stats["evictions"] == 0
+    kept = [a for a in first if store.features(a, 1, T0)["account_tx_1m"] == 2]
+    sets = store._candidates(np.array([account_key(a) for a in first], dtype=np.uint64))[0]
+    latest = [a for s in (0, 1) for a in [a for a, t in zip(first, sets) if t == s][-4:]]
+    assert sorted(kept) == sorted(latest)
+
+    # Later accounts evict the least recently seen rows
+    second = [f"second-{i}" for i in range(40)]
+    store.record_many(second, np.ones(len(second)), T0 + 10)
+    stats = store.stats()
+    assert stats["evictions"] == 8
+    assert stats["dropped"] == 64
+    assert not any(store.features(a, 1, T0 + 10)["account_tx_1m"] == 2 for a in kept)
+
+
+def test_lock_timeout_skips_instead_of_touching_the_table(store):
+    store.record("a", 10, T0)
+    store._lock.acquire()
+    try:
+        assert store.features("a", 10, T0) == NO_HISTORY
+        store.record("a", 10, T0)
+    finally:
+        store._lock.release()
+
+    stats = store.stats()
+    assert stats["events"] == 1
+    assert stats["skipped_features"] == 1
+    assert stats["skipped_records"] == 1
+    assert store.features("a", 10, T0)["account_tx_1m"] == 2
+
+
+def test_disabled_store_has_no_history():
+    store = VelocityStore(50, max_accounts=0)
+    assert not store.enabled
+    store.record("a", 10, T0)
+    assert store.features("a", 10, T0) == NO_HISTORY